@@ -13,7 +13,7 @@ import uuid
 from pathlib import Path
 from langdetect import detect, LangDetectException
 from app.extractors.pdf_extractor import PDFExtractor
-from app.services.openai_service import OpenAIService
+from app.services.openai_service import get_openai_service
 from app.services.storage_service import StorageService
 from app.services.image_processor import ImageProcessor
 from app.core.database import get_database
@@ -142,7 +142,7 @@ async def extract_from_file(
 
         # Extract product data using OpenAI
         logger.info("Structuring product data with OpenAI...")
-        openai_service = OpenAIService()
+        openai_service = get_openai_service()
         extracted_text = extraction_result.get("text", "")
 
         if not extracted_text or len(extracted_text.strip()) < 50:
@@ -194,7 +194,8 @@ async def extract_from_file(
             stored_product = await storage_service.create_product(
                 product_data=fields,
                 sources=[source],
-                extraction_job_id=f"upload_{file_id}"
+                extraction_job_id=f"upload_{file_id}",
+                mutate=True  # fields is not reused
             )
             stored_products.append(stored_product)
 
@@ -267,7 +268,7 @@ async def extract_from_directory(
 
         # Initialize extraction services
         pdf_extractor = PDFExtractor()
-        openai_service = OpenAIService()
+        openai_service = get_openai_service()
 
         # Track results
         results = {
@@ -359,7 +360,8 @@ async def extract_from_directory(
                     stored_product = await storage_service.create_product(
                         product_data=fields,
                         sources=[source],
-                        extraction_job_id=job_id
+                        extraction_job_id=job_id,
+                        mutate=True  # fields is not reused
                     )
                     stored_products.append({
                         "id": str(stored_product["_id"]),
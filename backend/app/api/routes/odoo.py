@@ -4,8 +4,11 @@ Handles fetching products from Odoo and synchronization.
 """
 
 from fastapi import APIRouter, HTTPException, Query, Depends
+from fastapi.responses import Response
 from typing import Optional, List
 from pydantic import BaseModel
+import base64
+import binascii
 import logging
 import math
 
@@ -27,10 +30,11 @@ async def get_storage_service(db=Depends(get_database)):
 class OdooProductListResponse(BaseModel):
     """Response schema for Odoo product list."""
     products: List[dict]
-    total: int
+    total: Optional[int]
     page: int
     limit: int
-    pages: int
+    pages: Optional[int]
+    has_more: bool
 
 
 @router.get("/test-connection")
@@ -41,7 +45,7 @@ async def test_odoo_connection():
     """
     try:
         odoo = get_odoo_service()
-        result = odoo.test_connection()
+        result = await odoo.test_connection()
         return result
     except Exception as e:
         logger.error(f"Error testing Odoo connection: {e}")
@@ -53,7 +57,9 @@ async def get_odoo_products(
     page: int = Query(1, ge=1),
     limit: int = Query(50, ge=1, le=200),
     search: Optional[str] = Query(None, description="Search by name, code, or barcode"),
-    active_only: bool = Query(True, description="Only show active products")
+    active_only: bool = Query(True, description="Only show active products"),
+    exact_count: bool = Query(False, description="Compute the exact total (extra Odoo search_count query)"),
+    view: str = Query("card", pattern="^(card|table)$", description="card (with thumbnail) or table (no image)")
 ):
     """
     Get paginated list of products from Odoo.
@@ -63,6 +69,8 @@ async def get_odoo_products(
         limit: Number of products per page
         search: Optional search term
         active_only: Filter for active products only
+        exact_count: Compute total/pages; otherwise only has_more is returned
+        view: Field set to fetch ("table" skips manufacturer and thumbnail)
     """
     try:
         odoo = get_odoo_service()
@@ -75,24 +83,26 @@ async def get_odoo_products(
 
         if search:
             # Search in name, default_code, and barcode
-            search_domain = [
-                '|', '|',
-                ['name', 'ilike', search],
-                ['default_code', 'ilike', search],
-                ['barcode', 'ilike', search]
-            ]
+            search_domain = OdooService.build_search_domain(search)
             if domain:
                 domain = ['&'] + domain + search_domain
             else:
                 domain = search_domain
 
-        products, total = odoo.get_products(
+        fields = OdooService.PRODUCT_CARD_FIELDS if view == "card" else OdooService.PRODUCT_TABLE_FIELDS
+
+        products, total, has_more = await odoo.get_products(
             limit=limit,
             offset=offset,
-            search_domain=domain if domain else None
+            search_domain=domain if domain else None,
+            fields=fields,
+            exact_count=exact_count
         )
 
-        pages = math.ceil(total / limit) if total > 0 else 0
+        if total is None:
+            pages = None
+        else:
+            pages = math.ceil(total / limit) if total > 0 else 0
 
         # Format products for frontend (list view - lighter fields)
         formatted_products = []
@@ -111,7 +121,7 @@ async def get_odoo_products(
                 "is_published": p.get('is_published'),
                 "constructeur": p.get('constructeur') or None,
                 "ref_constructeur": p.get('refConstructeur') or None,
-                "image_small": p.get('image_128'),  # Base64 encoded
+                "image_small": strip_data_uri(p.get('image_128')) or None,  # Base64 encoded
                 "write_date": p.get('write_date'),
             })
 
@@ -120,7 +130,8 @@ async def get_odoo_products(
             "total": total,
             "page": page,
             "limit": limit,
-            "pages": pages
+            "pages": pages,
+            "has_more": has_more
         }
 
     except Exception as e:
@@ -128,15 +139,49 @@ async def get_odoo_products(
         raise HTTPException(status_code=500, detail=f"Error fetching Odoo products: {str(e)}")
 
 
+def strip_data_uri(image: Optional[str]) -> Optional[str]:
+    """Remove a "data:<mime>;base64," prefix from a base64 image, if present."""
+    if image and image.startswith("data:"):
+        return image.split(",", 1)[-1]
+    return image
+
+
+def guess_image_media_type(content: bytes) -> str:
+    """Guess the media type of raw image bytes from their signature."""
+    if content.startswith(b"\x89PNG"):
+        return "image/png"
+    if content.startswith(b"\xff\xd8"):
+        return "image/jpeg"
+    if content.startswith((b"GIF87a", b"GIF89a")):
+        return "image/gif"
+    if content[:4] == b"RIFF" and content[8:12] == b"WEBP":
+        return "image/webp"
+    if content.lstrip().startswith((b"<svg", b"<?xml")):
+        return "image/svg+xml"
+    return "application/octet-stream"
+
+
 @router.get("/products/{product_id}")
-async def get_odoo_product(product_id: int):
+async def get_odoo_product(
+    product_id: int,
+    image_size: int = Query(
+        OdooService.DEFAULT_IMAGE_SIZE,
+        description=f"Image resolution to include, one of {OdooService.IMAGE_SIZES}"
+    )
+):
     """
     Get a single product from Odoo by ID.
-    Returns full product details including images.
+    Returns full product details with the image at the requested resolution only.
     """
+    if image_size not in OdooService.IMAGE_SIZES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid image_size {image_size}, expected one of {list(OdooService.IMAGE_SIZES)}"
+        )
+
     try:
         odoo = get_odoo_service()
-        product = odoo.get_product_by_id(product_id)
+        product = await odoo.get_product_by_id(product_id, image_size=image_size)
 
         if not product:
             raise HTTPException(status_code=404, detail=f"Product {product_id} not found in Odoo")
@@ -183,12 +228,13 @@ async def get_odoo_product(product_id: int):
             "list_price": product.get('list_price'),
             "taxes_id": product.get('taxes_id'),
 
-            # Images (Base64 encoded)
-            "image_1920": product.get('image_1920'),
-            "image_1024": product.get('image_1024'),
-            "image_512": product.get('image_512'),
-            "image_256": product.get('image_256'),
-            "image_128": product.get('image_128'),
+            # Images (Base64 encoded, only the requested size is fetched)
+            "image_size": image_size,
+            "image_1920": strip_data_uri(product.get('image_1920')) or None,
+            "image_1024": strip_data_uri(product.get('image_1024')) or None,
+            "image_512": strip_data_uri(product.get('image_512')) or None,
+            "image_256": strip_data_uri(product.get('image_256')) or None,
+            "image_128": strip_data_uri(product.get('image_128')) or None,
             "product_template_image_ids": product.get('product_template_image_ids'),
 
             # Technical documents
@@ -211,6 +257,37 @@ async def get_odoo_product(product_id: int):
         raise HTTPException(status_code=500, detail=f"Error fetching Odoo product: {str(e)}")
 
 
+@router.get("/products/{product_id}/raw_image")
+async def get_odoo_product_raw_image(product_id: int):
+    """
+    Get the full resolution image (image_1920) of an Odoo product.
+    Fetched on demand and returned as binary image content.
+    """
+    try:
+        odoo = get_odoo_service()
+        product = await odoo.get_product_by_id(product_id, fields=["id", "image_1920"])
+
+        if not product:
+            raise HTTPException(status_code=404, detail=f"Product {product_id} not found in Odoo")
+
+        image = strip_data_uri(product.get('image_1920'))
+        if not image:
+            raise HTTPException(status_code=404, detail=f"Product {product_id} has no image")
+
+        try:
+            content = base64.b64decode(image)
+        except (binascii.Error, ValueError):
+            raise HTTPException(status_code=502, detail=f"Invalid image data for product {product_id}")
+
+        return Response(content=content, media_type=guess_image_media_type(content))
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting image for Odoo product {product_id}: {e}")
+        raise HTTPException(status_code=500, detail=f"Error fetching Odoo product image: {str(e)}")
+
+
 @router.get("/products/{product_id}/match")
 async def find_catalog_match(
     product_id: int,
@@ -228,9 +305,9 @@ async def find_catalog_match(
     5. Fuzzy name matching (score: 0.60-0.75)
     """
     try:
-        # Get the Odoo product first
+        # Get the Odoo product first (thumbnail only)
         odoo = get_odoo_service()
-        product = odoo.get_product_by_id(product_id)
+        product = await odoo.get_product_by_id(product_id, image_size=128)
 
         if not product:
             raise HTTPException(status_code=404, detail=f"Product {product_id} not found in Odoo")
@@ -263,7 +340,7 @@ async def find_catalog_match(
                 "code_ean": product.get('Code_EAN'),
                 "constructeur": product.get('constructeur'),
                 "ref_constructeur": product.get('refConstructeur'),
-                "image_128": product.get('image_128'),
+                "image_128": strip_data_uri(product.get('image_128')) or None,
             },
             "search_criteria": {
                 "default_code": product.get('default_code'),
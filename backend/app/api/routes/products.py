@@ -33,6 +33,7 @@ async def get_products(
     status: Optional[str] = Query(None, description="Filter by extraction status"),
     search: Optional[str] = Query(None, description="Full-text search"),
     source_type: Optional[str] = Query(None, description="Filter by source type (pdf, directory, web)"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page (faster than page for deep pages)"),
     storage_service: StorageService = Depends(get_storage_service)
 ):
     """
@@ -43,7 +44,15 @@ async def get_products(
     - **status**: Filter by extraction status (raw, validated, exported)
     - **search**: Full-text search on name and description
     - **source_type**: Filter by source type (pdf, directory, web)
+    - **cursor**: Keyset cursor returned as next_cursor (ignored with search)
     """
+    keyset = None
+    if cursor and not search:
+        try:
+            keyset = StorageService.decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
     try:
         skip = (page - 1) * limit
 
@@ -54,22 +63,38 @@ async def get_products(
         if source_type:
             filters["source_type"] = source_type
 
-        # Apply filters
+        # Apply filters (list view only needs a few fields per product)
+        projection = StorageService.LIST_PROJECTION
         if search:
-            products, total = await storage_service.search_products(search, skip, limit, filters)
+            products, total = await storage_service.search_products(
+                search, skip, limit, filters,
+                projection=projection,
+                count_limit=StorageService.SEARCH_COUNT_LIMIT
+            )
         elif filters:
-            products, total = await storage_service.get_products_with_filters(filters, skip, limit)
+            products, total = await storage_service.get_products_with_filters(
+                filters, skip, limit, projection=projection, cursor=keyset
+            )
         else:
-            products, total = await storage_service.get_products(skip, limit)
+            products, total = await storage_service.get_products(
+                skip, limit, projection=projection, cursor=keyset
+            )
 
         pages = math.ceil(total / limit) if total > 0 else 0
 
+        # Search results are ranked, not in created_at order, so no keyset cursor
+        next_cursor = None
+        if not search and len(products) == limit:
+            next_cursor = StorageService.encode_cursor(products[-1])
+
         return ProductListResponse(
             products=products,
             total=total,
             page=page,
             limit=limit,
-            pages=pages
+            pages=pages,
+            next_cursor=next_cursor,
+            total_capped=bool(search) and total >= StorageService.SEARCH_COUNT_LIMIT
         )
 
     except Exception as e:
@@ -264,7 +289,9 @@ async def get_product_sources(
 ):
     """Get extraction sources for a product."""
     try:
-        product = await storage_service.get_product_by_id(product_id)
+        product = await storage_service.get_product_by_id(
+            product_id, projection={"sources": 1, "_sv": 1}
+        )
 
         if not product:
             raise HTTPException(status_code=404, detail=f"Product {product_id} not found")
@@ -227,13 +227,46 @@ class Product(ProductBase):
         populate_by_name = True
 
 
+class ProductListMetadata(BaseModel):
+    """Extraction metadata fields included in list views."""
+    status: Optional[str] = None
+    field_confidence_scores: Optional[Dict[str, float]] = None
+
+
+class ProductListItem(BaseModel):
+    """
+    Product row for list views (StorageService.LIST_PROJECTION fields only).
+
+    Fields left out of the projection are not part of the model, and nothing
+    is defaulted, so the response never shows values that aren't stored.
+    `images` holds at most the first image; fetch the product for all of them.
+    """
+
+    id: PyObjectId = Field(alias="_id")
+    name: Optional[str] = None
+    default_code: Optional[str] = None
+    constructeur: Optional[str] = None
+    lst_price: Optional[float] = None
+    description_courte: Optional[str] = None
+    images: Optional[List[ProductImage]] = None  # First image only
+    extraction_metadata: Optional[ProductListMetadata] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        json_encoders = {ObjectId: str}
+        populate_by_name = True
+
+
 class ProductListResponse(BaseModel):
     """Response schema for product list."""
-    products: List[Product]
+    products: List[ProductListItem]
     total: int
     page: int
     limit: int
     pages: int
+    next_cursor: Optional[str] = None  # Pass as `cursor` to fetch the next page
+    total_capped: bool = False  # Search count stopped at the limit: total is a lower bound
 
 
 class ProductResponse(BaseModel):
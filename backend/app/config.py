@@ -32,6 +32,13 @@ class Settings(BaseSettings):
 
     # Database
     database_name: str = "odoo_catalog"
+    mongodb_max_pool_size: int = 100  # Sockets per process; keep under the cluster connection limit
+    mongodb_min_pool_size: int = 10  # Warm sockets so bursts don't wait on TLS handshakes
+    mongodb_wait_queue_timeout_ms: int = 5000  # Fail a request instead of queueing forever when the pool is exhausted
+    mongodb_compressors: str = "zstd,zlib"  # Wire compression, first one the server supports wins
+    mongodb_zlib_level: int = 3  # Only used when zlib is negotiated
+    ingest_concurrency: int = 8  # Concurrent insert_many batches in bulk inserts
+    ingest_batch_size: int = 1000  # Documents per insert_many batch in bulk inserts
 
     # CORS
     cors_origins: list = ["http://localhost:5173", "http://localhost:3000"]
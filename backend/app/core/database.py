@@ -23,8 +23,11 @@ class Database:
             self.client = AsyncIOMotorClient(
                 settings.mongodb_url,
                 serverSelectionTimeoutMS=5000,
-                maxPoolSize=10,
-                minPoolSize=1,
+                maxPoolSize=settings.mongodb_max_pool_size,
+                minPoolSize=settings.mongodb_min_pool_size,
+                waitQueueTimeoutMS=settings.mongodb_wait_queue_timeout_ms,
+                compressors=settings.mongodb_compressors,
+                zlibCompressionLevel=settings.mongodb_zlib_level,
             )
 
             # Verify connection
@@ -56,15 +59,31 @@ class Database:
 
         try:
             # Products collection indexes
-            await self.db.products.create_index("default_code", unique=True, sparse=True)
+            # Unique only for real codes: missing, null and "" are left out of the index
+            await self._migrate_to_partial_index("default_code")
+            await self.db.products.create_index(
+                "default_code",
+                unique=True,
+                partialFilterExpression={"default_code": {"$gt": ""}}
+            )
             await self.db.products.create_index("barcode")
             await self.db.products.create_index("Code_EAN")
             await self.db.products.create_index([("refConstructeur", 1), ("constructeur", 1)])
-            await self.db.products.create_index("extraction_metadata.status")
+            # Filtered listings: equality field first, then the LIST_SORT keys
+            await self.db.products.create_index(
+                [("extraction_metadata.status", 1), ("created_at", -1), ("_id", -1)]
+            )
+            await self.db.products.create_index(
+                [("sources.source_type", 1), ("created_at", -1), ("_id", -1)]
+            )
             await self.db.products.create_index("extraction_metadata.extraction_job_id")
             await self.db.products.create_index("duplicate_group_id")
             await self.db.products.create_index([("name", "text"), ("description_courte", "text")])
-            await self.db.products.create_index("created_at")
+            await self.db.products.create_index([("created_at", -1), ("_id", -1)])
+            # Single-field indexes now covered as prefixes of the compound ones above
+            # (dropped after their replacements exist)
+            await self._drop_superseded_index("extraction_metadata.status_1")
+            await self._drop_superseded_index("created_at_1")
 
             # Extraction jobs collection indexes
             await self.db.extraction_jobs.create_index("job_id", unique=True)
@@ -87,6 +106,21 @@ class Database:
             logger.error(f"Error creating indexes: {e}")
             # Don't raise - indexes may already exist
 
+    async def _migrate_to_partial_index(self, field: str):
+        """Drop the legacy sparse index on `field` so it can be recreated as partial."""
+        index_name = f"{field}_1"
+        indexes = await self.db.products.index_information()
+        if index_name in indexes and "partialFilterExpression" not in indexes[index_name]:
+            logger.info(f"Replacing sparse index {index_name} with a partial index")
+            await self.db.products.drop_index(index_name)
+
+    async def _drop_superseded_index(self, index_name: str):
+        """Drop a products index that a compound index now covers as its prefix."""
+        indexes = await self.db.products.index_information()
+        if index_name in indexes:
+            logger.info(f"Dropping index {index_name}, covered by a compound index")
+            await self.db.products.drop_index(index_name)
+
 
 # Global database instance
 database = Database()
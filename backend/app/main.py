@@ -4,6 +4,7 @@ Product Catalog Extraction API for Odoo e-commerce enrichment.
 """
 
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from app.core.database import database
@@ -30,7 +31,8 @@ app = FastAPI(
     description="Extract product information from documents and enrich Odoo e-commerce catalog",
     version="1.0.0 (MVP - Phase 1)",
     docs_url="/api/docs",
-    redoc_url="/api/redoc"
+    redoc_url="/api/redoc",
+    default_response_class=ORJSONResponse  # orjson renders product lists much faster than json
 )
 
 # CORS middleware
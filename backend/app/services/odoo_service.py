@@ -4,12 +4,39 @@ Handles authentication and product operations.
 """
 
 import xmlrpc.client
+import asyncio
 import logging
+import re
+import threading
+import time
 from typing import List, Dict, Any, Optional
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential_jitter
 from app.config import settings
+from app.utils.circuit_breaker import CircuitBreaker
 
 logger = logging.getLogger(__name__)
 
+# Transient transport errors worth retrying (OSError covers connection errors
+# and socket timeouts; Odoo Faults are not retried)
+TRANSIENT_ODOO_ERRORS = (xmlrpc.client.ProtocolError, OSError)
+
+# Search terms that look like a product code / barcode (prefix search)
+CODE_SEARCH_PATTERN = re.compile(r'[A-Z0-9\-_]+')
+
+# Maximum concurrent XML-RPC calls running in worker threads
+MAX_CONCURRENT_CALLS = 20
+
+# Seconds to wait before retrying fields_get after it failed
+VALID_FIELDS_RETRY_SECONDS = 60
+
+# Shared breaker: fail fast while Odoo is unreachable
+odoo_breaker = CircuitBreaker(
+    "odoo",
+    fail_max=10,
+    reset_timeout=30,
+    failure_exceptions=TRANSIENT_ODOO_ERRORS
+)
+
 
 class OdooService:
     """Service for interacting with Odoo via XML-RPC."""
@@ -35,31 +62,47 @@ class OdooService:
         self.username = username or settings.odoo_username
         self.password = password or settings.odoo_password
         self._uid = None
-        self._common = None
-        self._models = None
+        self._auth_lock = threading.Lock()
+        # ServerProxy is not thread-safe: calls run in worker threads,
+        # so each thread gets its own endpoints
+        self._local = threading.local()
+        self._semaphore = asyncio.Semaphore(MAX_CONCURRENT_CALLS)
+        # product.template field names, loaded once with fields_get
+        self._valid_fields = None
+        self._valid_fields_lock = asyncio.Lock()
+        # monotonic time before which a failed fields_get is not retried
+        self._valid_fields_retry_at = 0.0
 
     def _get_common_endpoint(self):
-        """Get the common XML-RPC endpoint."""
-        if self._common is None:
-            self._common = xmlrpc.client.ServerProxy(
+        """Get the common XML-RPC endpoint (one per thread)."""
+        common = getattr(self._local, "common", None)
+        if common is None:
+            common = xmlrpc.client.ServerProxy(
                 f'{self.url}/xmlrpc/2/common',
                 allow_none=True
             )
-        return self._common
+            self._local.common = common
+        return common
 
     def _get_models_endpoint(self):
-        """Get the object/models XML-RPC endpoint."""
-        if self._models is None:
-            self._models = xmlrpc.client.ServerProxy(
+        """Get the object/models XML-RPC endpoint (one per thread)."""
+        models = getattr(self._local, "models", None)
+        if models is None:
+            models = xmlrpc.client.ServerProxy(
                 f'{self.url}/xmlrpc/2/object',
                 allow_none=True
             )
-        return self._models
+            self._local.models = models
+        return models
 
     def authenticate(self) -> int:
         """
         Authenticate with Odoo and return the user ID.
 
+        Thread-safe: calls run in worker threads, and concurrent first calls
+        share a single login. The login goes through odoo_breaker and the
+        transient-error retry, like execute_kw.
+
         Returns:
             User ID if successful
 
@@ -69,26 +112,61 @@ class OdooService:
         if self._uid is not None:
             return self._uid
 
-        try:
-            common = self._get_common_endpoint()
-            self._uid = common.authenticate(
-                self.db,
-                self.username,
-                self.password,
-                {}
-            )
+        # Double-checked locking: one XML-RPC login per process
+        with self._auth_lock:
+            if self._uid is None:
+                try:
+                    uid = odoo_breaker.call(self._authenticate_with_retry)
+                except Exception as e:
+                    logger.error(f"Odoo authentication error: {e}")
+                    raise
+
+                if not uid:
+                    logger.error("Odoo authentication error: invalid credentials")
+                    raise Exception("Authentication failed - invalid credentials")
+
+                self._uid = uid
+                logger.info(f"Authenticated with Odoo as user ID: {uid}")
+
+        return self._uid
+
+    @retry(
+        retry=retry_if_exception_type(TRANSIENT_ODOO_ERRORS),
+        wait=wait_exponential_jitter(initial=0.2, max=5),
+        stop=stop_after_attempt(5),
+        reraise=True
+    )
+    def _authenticate_with_retry(self) -> int:
+        """Call common.authenticate, retrying transient transport errors with exponential backoff."""
+        common = self._get_common_endpoint()
+        return common.authenticate(self.db, self.username, self.password, {})
+
+    async def execute_kw(
+        self,
+        model: str,
+        method: str,
+        args: List = None,
+        kwargs: Dict = None
+    ) -> Any:
+        """
+        Execute a method on an Odoo model without blocking the event loop.
 
-            if not self._uid:
-                raise Exception("Authentication failed - invalid credentials")
+        The synchronous XML-RPC call runs in a worker thread, with at most
+        MAX_CONCURRENT_CALLS calls in flight.
 
-            logger.info(f"Authenticated with Odoo as user ID: {self._uid}")
-            return self._uid
+        Args:
+            model: Odoo model name (e.g., 'product.template')
+            method: Method to call (e.g., 'search_read')
+            args: Positional arguments
+            kwargs: Keyword arguments
 
-        except Exception as e:
-            logger.error(f"Odoo authentication error: {e}")
-            raise
+        Returns:
+            Result from Odoo
+        """
+        async with self._semaphore:
+            return await asyncio.to_thread(self._execute_kw_sync, model, method, args, kwargs)
 
-    def execute_kw(
+    def _execute_kw_sync(
         self,
         model: str,
         method: str,
@@ -96,7 +174,7 @@ class OdooService:
         kwargs: Dict = None
     ) -> Any:
         """
-        Execute a method on an Odoo model.
+        Execute a method on an Odoo model (blocking).
 
         Args:
             model: Odoo model name (e.g., 'product.template')
@@ -108,24 +186,40 @@ class OdooService:
             Result from Odoo
         """
         uid = self.authenticate()
-        models = self._get_models_endpoint()
 
         try:
-            result = models.execute_kw(
-                self.db,
-                uid,
-                self.password,
-                model,
-                method,
-                args or [],
-                kwargs or {}
-            )
-            return result
+            return odoo_breaker.call(self._execute_kw_with_retry, uid, model, method, args, kwargs)
 
         except Exception as e:
             logger.error(f"Odoo execute_kw error on {model}.{method}: {e}")
             raise
 
+    @retry(
+        retry=retry_if_exception_type(TRANSIENT_ODOO_ERRORS),
+        wait=wait_exponential_jitter(initial=0.2, max=5),
+        stop=stop_after_attempt(5),
+        reraise=True
+    )
+    def _execute_kw_with_retry(
+        self,
+        uid: int,
+        model: str,
+        method: str,
+        args: List = None,
+        kwargs: Dict = None
+    ) -> Any:
+        """Call execute_kw, retrying transient transport errors with exponential backoff."""
+        models = self._get_models_endpoint()
+        return models.execute_kw(
+            self.db,
+            uid,
+            self.password,
+            model,
+            method,
+            args or [],
+            kwargs or {}
+        )
+
     # Standard fields to retrieve from Odoo (matching our catalog schema)
     PRODUCT_FIELDS = [
         "id",
@@ -137,11 +231,6 @@ class OdooService:
         "active",
         "description_courte",
         "description_ecommerce",
-        "image_512",
-        "image_256",
-        "image_1920",
-        "image_1024",
-        "image_128",  # For list view thumbnail
         "product_template_image_ids",
         "is_published",
         "constructeur",
@@ -165,8 +254,13 @@ class OdooService:
         "create_date",
     ]
 
-    # Lighter fields for list view
-    PRODUCT_LIST_FIELDS = [
+    # Image resolutions stored by Odoo (image_<size> fields). Only one size is
+    # requested per read: Odoo resizes smaller variants on the fly.
+    IMAGE_SIZES = (128, 256, 512, 1024, 1920)
+    DEFAULT_IMAGE_SIZE = 512
+
+    # Lighter fields for list view - table rows (no image)
+    PRODUCT_TABLE_FIELDS = [
         "id",
         "name",
         "default_code",
@@ -177,69 +271,173 @@ class OdooService:
         "type",
         "active",
         "is_published",
+        "write_date",
+    ]
+
+    # Lighter fields for list view - cards (manufacturer + thumbnail)
+    PRODUCT_CARD_FIELDS = PRODUCT_TABLE_FIELDS + [
         "constructeur",
         "refConstructeur",
         "image_128",
-        "write_date",
     ]
 
-    def get_products(
+    # Default list fields
+    PRODUCT_LIST_FIELDS = PRODUCT_CARD_FIELDS
+
+    async def get_valid_fields(self) -> Optional[set]:
+        """
+        Get the field names that exist on product.template.
+
+        Loaded once with fields_get and cached. Custom fields (constructeur,
+        Code_EAN, ...) may be missing on some instances. A failure is cached
+        too: reads skip fields_get for VALID_FIELDS_RETRY_SECONDS instead of
+        paying an extra (retried) RPC each while Odoo is flaky.
+
+        Returns:
+            Set of field names, or None if fields_get failed
+        """
+        if self._valid_fields is None and time.monotonic() >= self._valid_fields_retry_at:
+            async with self._valid_fields_lock:
+                if self._valid_fields is None and time.monotonic() >= self._valid_fields_retry_at:
+                    try:
+                        fields_info = await self.execute_kw(
+                            'product.template',
+                            'fields_get',
+                            [],
+                            {'attributes': ['type']}
+                        )
+                    except Exception as e:
+                        logger.warning(
+                            f"Could not load product.template fields, retrying in "
+                            f"{VALID_FIELDS_RETRY_SECONDS}s: {e}"
+                        )
+                        self._valid_fields_retry_at = time.monotonic() + VALID_FIELDS_RETRY_SECONDS
+                        return None
+
+                    self._valid_fields = set(fields_info)
+                    missing = [
+                        f for f in dict.fromkeys(self.PRODUCT_FIELDS + self.PRODUCT_CARD_FIELDS)
+                        if f not in self._valid_fields
+                    ]
+                    if missing:
+                        logger.warning(f"Fields not available on product.template, skipped: {missing}")
+
+        return self._valid_fields
+
+    async def _filter_fields(self, fields: List[str]) -> List[str]:
+        """Drop fields that do not exist on product.template."""
+        valid_fields = await self.get_valid_fields()
+        if valid_fields is None:
+            return fields
+        return [f for f in fields if f in valid_fields]
+
+    @staticmethod
+    def build_search_domain(search_term: str) -> List:
+        """
+        Build the Odoo domain to search products by name, default_code, or barcode.
+
+        Code-like terms (uppercase letters, digits, '-', '_') use a prefix match
+        on default_code/barcode, which can use an index, instead of a
+        '%term%' scan. The name is always matched anywhere.
+
+        Args:
+            search_term: Search string
+
+        Returns:
+            Odoo domain
+        """
+        if CODE_SEARCH_PATTERN.fullmatch(search_term):
+            # Escape the '_' LIKE wildcard so the code is matched literally
+            prefix = search_term.replace('_', '\\_') + '%'
+            return [
+                '|', '|',
+                ['name', 'ilike', search_term],
+                ['default_code', '=ilike', prefix],
+                ['barcode', '=ilike', prefix]
+            ]
+
+        return [
+            '|', '|',
+            ['name', 'ilike', search_term],
+            ['default_code', 'ilike', search_term],
+            ['barcode', 'ilike', search_term]
+        ]
+
+    async def get_products(
         self,
         limit: int = 50,
         offset: int = 0,
         search_domain: List = None,
-        fields: List[str] = None
-    ) -> tuple[List[Dict[str, Any]], int]:
+        fields: List[str] = None,
+        exact_count: bool = False
+    ) -> tuple[List[Dict[str, Any]], Optional[int], bool]:
         """
         Get products from Odoo with pagination.
 
+        One extra row is fetched to know whether more products follow, so the
+        search_count query only runs when an exact total is requested.
+
         Args:
             limit: Maximum number of products to return
             offset: Number of products to skip
             search_domain: Odoo domain filter (e.g., [['active', '=', True]])
             fields: List of fields to retrieve
+            exact_count: Compute the exact total count
 
         Returns:
-            Tuple of (products list, total count)
+            Tuple of (products list, total count or None, has_more)
         """
         domain = search_domain or []
 
         # Default fields to retrieve (lighter version for list)
         if fields is None:
             fields = self.PRODUCT_LIST_FIELDS
+        fields = await self._filter_fields(fields)
 
         try:
-            # Get total count
-            total = self.execute_kw(
-                'product.template',
-                'search_count',
-                [domain]
-            )
-
-            # Get products
-            products = self.execute_kw(
+            # Get products (+1 row to detect a next page)
+            rows = await self.execute_kw(
                 'product.template',
                 'search_read',
                 [domain],
                 {
                     'fields': fields,
-                    'limit': limit,
+                    'limit': limit + 1,
                     'offset': offset,
                     'order': 'write_date desc'
                 }
             )
 
-            logger.info(f"Retrieved {len(products)} products from Odoo (total: {total})")
-            return products, total
+            has_more = len(rows) > limit
+            products = rows[:limit]
+
+            total = None
+            if exact_count:
+                if not has_more and (products or offset == 0):
+                    # Last page reached: the total is known without counting
+                    total = offset + len(products)
+                else:
+                    total = await self.execute_kw(
+                        'product.template',
+                        'search_count',
+                        [domain]
+                    )
+
+            logger.info(
+                f"Retrieved {len(products)} products from Odoo "
+                f"(total: {total}, has_more: {has_more})"
+            )
+            return products, total, has_more
 
         except Exception as e:
             logger.error(f"Error getting Odoo products: {e}")
             raise
 
-    def get_product_by_id(
+    async def get_product_by_id(
         self,
         product_id: int,
-        fields: List[str] = None
+        fields: List[str] = None,
+        image_size: Optional[int] = DEFAULT_IMAGE_SIZE
     ) -> Optional[Dict[str, Any]]:
         """
         Get a single product by ID with all details.
@@ -247,19 +445,27 @@ class OdooService:
         Args:
             product_id: Odoo product.template ID
             fields: List of fields to retrieve
+            image_size: Image resolution to include (one of IMAGE_SIZES),
+                or None to skip the image. Ignored when fields is given.
 
         Returns:
             Product dict or None if not found
         """
-        # Use full PRODUCT_FIELDS for detail view
+        # Use full PRODUCT_FIELDS for detail view, with a single image size
         if fields is None:
-            fields = self.PRODUCT_FIELDS
+            fields = list(self.PRODUCT_FIELDS)
+            if image_size is not None:
+                if image_size not in self.IMAGE_SIZES:
+                    raise ValueError(f"Invalid image size {image_size}, expected one of {self.IMAGE_SIZES}")
+                fields.append(f"image_{image_size}")
+        fields = await self._filter_fields(fields)
 
         try:
-            products = self.execute_kw(
+            # The id is known: read it directly instead of search_read (no search step)
+            products = await self.execute_kw(
                 'product.template',
-                'search_read',
-                [[['id', '=', product_id]]],
+                'read',
+                [[product_id]],
                 {'fields': fields}
             )
 
@@ -267,16 +473,24 @@ class OdooService:
                 return products[0]
             return None
 
+        except xmlrpc.client.Fault as e:
+            # read raises MissingError for unknown/deleted ids (search_read returned [])
+            if "MissingError" in str(e.faultString) or "does not exist" in str(e.faultString):
+                logger.warning(f"Odoo product {product_id} not found")
+                return None
+            logger.error(f"Error getting Odoo product {product_id}: {e}")
+            raise
         except Exception as e:
             logger.error(f"Error getting Odoo product {product_id}: {e}")
             raise
 
-    def search_products(
+    async def search_products(
         self,
         search_term: str,
         limit: int = 50,
-        offset: int = 0
-    ) -> tuple[List[Dict[str, Any]], int]:
+        offset: int = 0,
+        exact_count: bool = False
+    ) -> tuple[List[Dict[str, Any]], Optional[int], bool]:
         """
         Search products by name, default_code, or barcode.
 
@@ -284,25 +498,22 @@ class OdooService:
             search_term: Search string
             limit: Maximum results
             offset: Pagination offset
+            exact_count: Compute the exact total count
 
         Returns:
-            Tuple of (products list, total count)
+            Tuple of (products list, total count or None, has_more)
         """
         # Search in name, default_code, and barcode
-        domain = [
-            '|', '|',
-            ['name', 'ilike', search_term],
-            ['default_code', 'ilike', search_term],
-            ['barcode', 'ilike', search_term]
-        ]
+        domain = self.build_search_domain(search_term)
 
-        return self.get_products(
+        return await self.get_products(
             limit=limit,
             offset=offset,
-            search_domain=domain
+            search_domain=domain,
+            exact_count=exact_count
         )
 
-    def test_connection(self) -> Dict[str, Any]:
+    async def test_connection(self) -> Dict[str, Any]:
         """
         Test the connection to Odoo.
 
@@ -310,20 +521,19 @@ class OdooService:
             Dict with connection status and info
         """
         try:
-            common = self._get_common_endpoint()
-
             # Get server version
-            version = common.version()
+            version = await asyncio.to_thread(lambda: self._get_common_endpoint().version())
 
             # Try to authenticate
-            uid = self.authenticate()
+            uid = await asyncio.to_thread(self.authenticate)
 
             return {
                 "status": "connected",
                 "server_version": version.get('server_version'),
                 "user_id": uid,
                 "database": self.db,
-                "url": self.url
+                "url": self.url,
+                "circuit_breaker": odoo_breaker.state
             }
 
         except Exception as e:
@@ -332,17 +542,22 @@ class OdooService:
                 "status": "error",
                 "error": str(e),
                 "url": self.url,
-                "database": self.db
+                "database": self.db,
+                "circuit_breaker": odoo_breaker.state
             }
 
 
 # Singleton instance for reuse
 _odoo_service = None
+_odoo_service_lock = threading.Lock()
 
 
 def get_odoo_service() -> OdooService:
-    """Get or create the Odoo service singleton."""
+    """Get or create the Odoo service singleton (thread-safe, created once)."""
     global _odoo_service
     if _odoo_service is None:
-        _odoo_service = OdooService()
+        # Double-checked locking: concurrent first calls create a single instance
+        with _odoo_service_lock:
+            if _odoo_service is None:
+                _odoo_service = OdooService()
     return _odoo_service
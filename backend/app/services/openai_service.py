@@ -5,13 +5,27 @@ Handles GPT-based structured data extraction from text.
 
 import logging
 import json
-from typing import Dict, Any, List, Optional
-from openai import AsyncOpenAI
+import threading
+from typing import Dict, Any, List, Optional, AsyncIterator, Tuple
+from openai import AsyncOpenAI, APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential_jitter
 from app.config import settings
+from app.utils.circuit_breaker import CircuitBreaker
 import asyncio
 
 logger = logging.getLogger(__name__)
 
+# Transient OpenAI errors worth retrying (rate limits, network, 5xx)
+TRANSIENT_OPENAI_ERRORS = (RateLimitError, APIConnectionError, APITimeoutError, InternalServerError)
+
+# Shared breaker across service instances: fail fast while OpenAI is unavailable
+openai_breaker = CircuitBreaker(
+    "openai",
+    fail_max=10,
+    reset_timeout=30,
+    failure_exceptions=TRANSIENT_OPENAI_ERRORS
+)
+
 
 # Prompt templates for product extraction
 PRODUCT_EXTRACTION_PROMPT = """Tu es un expert en extraction de données produits. Extrait les informations structurées du texte suivant.
@@ -99,8 +113,15 @@ IMPORTANT :
 class OpenAIService:
     """Service for interacting with OpenAI API."""
 
+    # Text length limits for a single GPT call and for chunked processing
+    MAX_TEXT_CHARS = 20000  # ~5000 tokens (safe for GPT-3.5-turbo 16k limit)
+    CHUNK_SIZE = 18000  # Safe size per chunk (~4500 tokens)
+    CHUNK_OVERLAP = 500  # Overlap between chunks to avoid cutting product descriptions
+    MAX_CONCURRENT_CHUNKS = 3  # Concurrent chunk calls (avoid rate limiting)
+
     def __init__(self):
-        self.client = AsyncOpenAI(api_key=settings.openai_api_key)
+        # Retries are handled by _create_completion (tenacity), not by the SDK
+        self.client = AsyncOpenAI(api_key=settings.openai_api_key, max_retries=0)
         self.default_model = "gpt-3.5-turbo"  # MVP uses GPT-3.5 for cost efficiency
 
     async def extract_product_data(
@@ -127,15 +148,62 @@ class OpenAIService:
             }
 
         # Handle very long text with intelligent chunking
-        max_chars = 20000  # ~5000 tokens (safe for GPT-3.5-turbo 16k limit)
-
-        if len(extracted_text) > max_chars:
+        if len(extracted_text) > self.MAX_TEXT_CHARS:
             logger.info(f"Text is long ({len(extracted_text)} chars), using chunking strategy")
             return await self._extract_with_chunking(extracted_text, model)
 
         # For reasonable length text, process normally
         return await self._call_openai(extracted_text, model)
 
+    async def extract_product_data_stream(
+        self,
+        extracted_text: str,
+        model: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Extract structured product data, yielding products as soon as they are available.
+
+        Long texts are chunked and each chunk's products are yielded as soon as
+        that chunk (and every earlier one) completes, instead of waiting for the
+        whole document.
+
+        Products found again in a later overlapping chunk are skipped rather than
+        merged with _merge_duplicate_products: the first occurrence has already
+        been handed to the caller, so later higher-confidence values can't be
+        folded into it. Products come in chunk order, so the kept occurrence is
+        the same one extract_product_data keeps; only its fields may differ.
+        Use extract_product_data when fully merged products matter more than
+        latency.
+
+        Args:
+            extracted_text: Raw text extracted from document
+            model: OpenAI model to use (defaults to gpt-3.5-turbo)
+
+        Yields:
+            Product dicts (with "fields" and "confidence_scores")
+        """
+        if not extracted_text or len(extracted_text.strip()) < 10:
+            logger.warning("Extracted text is too short for processing")
+            return
+
+        if len(extracted_text) <= self.MAX_TEXT_CHARS:
+            result = await self._call_openai(extracted_text, model)
+            for product in result.get("products", []):
+                yield product
+            return
+
+        logger.info(f"Text is long ({len(extracted_text)} chars), streaming chunked extraction")
+        chunks = self._split_into_chunks(extracted_text)
+        seen = set()
+        async for product in self._iter_chunk_products(chunks, model):
+            # Skip products already yielded from an earlier overlapping chunk
+            key = self._product_key(product)
+            if key is not None:
+                if key in seen:
+                    continue
+                seen.add(key)
+            yield product
+
     async def _call_openai(
         self,
         text: str,
@@ -159,7 +227,8 @@ class OpenAIService:
             model_to_use = model or self.default_model
             logger.info(f"Calling OpenAI API with model {model_to_use} ({len(text)} chars)")
 
-            response = await self.client.chat.completions.create(
+            response = await openai_breaker.call_async(
+                self._create_completion,
                 model=model_to_use,
                 messages=[
                     {
@@ -203,23 +272,31 @@ class OpenAIService:
                 "error": str(e)
             }
 
-    async def _extract_with_chunking(
-        self,
-        text: str,
-        model: Optional[str] = None
-    ) -> Dict[str, Any]:
+    @retry(
+        retry=retry_if_exception_type(TRANSIENT_OPENAI_ERRORS),
+        wait=wait_exponential_jitter(initial=0.5, max=10),
+        stop=stop_after_attempt(5),
+        reraise=True
+    )
+    async def _create_completion(self, **kwargs):
+        """Create a chat completion, retrying transient errors with exponential backoff."""
+        return await self.client.chat.completions.create(**kwargs)
+
+    def _split_into_chunks(self, text: str) -> List[str]:
         """
-        Extract product data from very long text by splitting into chunks.
+        Split long text into overlapping chunks on paragraph/sentence boundaries.
 
         Args:
-            text: Long text to process
-            model: OpenAI model to use
+            text: Long text to split
 
         Returns:
-            Merged results from all chunks
+            List of text chunks
         """
-        chunk_size = 18000  # Safe size per chunk (~4500 tokens)
-        overlap = 500  # Overlap between chunks to avoid cutting product descriptions
+        chunk_size = self.CHUNK_SIZE
+        overlap = self.CHUNK_OVERLAP
+
+        # Breaking points are only searched in the last 30% of each chunk
+        min_break = int(chunk_size * 0.7) + 1
 
         chunks = []
         start = 0
@@ -227,50 +304,183 @@ class OpenAIService:
         # Split text into overlapping chunks
         while start < len(text):
             end = start + chunk_size
-            chunk = text[start:end]
 
-            # Try to find a good breaking point (paragraph or sentence)
+            # Try to find a good breaking point (paragraph or sentence),
+            # bounding the search to the chunk tail instead of the whole chunk
             if end < len(text):
+                tail_start = start + min_break
+
                 # Look for paragraph break
-                last_paragraph = chunk.rfind('\n\n')
-                if last_paragraph > chunk_size * 0.7:  # At least 70% of chunk
-                    end = start + last_paragraph
+                last_paragraph = text.rfind('\n\n', tail_start, end)
+                if last_paragraph != -1:
+                    end = last_paragraph
                 else:
                     # Look for sentence break
-                    last_sentence = max(chunk.rfind('. '), chunk.rfind('.\n'))
-                    if last_sentence > chunk_size * 0.7:
-                        end = start + last_sentence + 1
+                    last_sentence = max(
+                        text.rfind('. ', tail_start, end),
+                        text.rfind('.\n', tail_start, end)
+                    )
+                    if last_sentence != -1:
+                        end = last_sentence + 1
 
             chunks.append(text[start:end])
             start = end - overlap  # Overlap to avoid cutting products
 
         logger.info(f"Split text into {len(chunks)} chunks for processing")
+        return chunks
 
-        # Process each chunk
-        all_products = []
-        total_tokens = 0
+    async def _iter_chunk_products(
+        self,
+        chunks: List[str],
+        model: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process chunks concurrently and yield products in chunk order.
+
+        A chunk's products are yielded as soon as that chunk and every earlier
+        chunk have completed, so the output order does not depend on which
+        OpenAI call finishes first.
+
+        Args:
+            chunks: Text chunks to process
+            model: OpenAI model to use
 
-        for i, chunk in enumerate(chunks):
-            logger.info(f"Processing chunk {i+1}/{len(chunks)} ({len(chunk)} chars)")
+        Yields:
+            Product dicts, chunk by chunk
+        """
+        semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_CHUNKS)
 
-            try:
+        async def process_chunk(index, chunk):
+            async with semaphore:
                 # Use internal method to avoid recursion
-                result = await self._call_openai(chunk, model)
+                try:
+                    return index, await self._call_openai(chunk, model)
+                except Exception as e:
+                    logger.error(f"Error processing chunk {index + 1}/{len(chunks)}: {e}")
+                    return index, None
+
+        tasks = [
+            asyncio.create_task(process_chunk(index, chunk))
+            for index, chunk in enumerate(chunks)
+        ]
+
+        try:
+            # Results that finished ahead of an earlier chunk wait here
+            finished = {}
+            next_index = 0
+            for completed, future in enumerate(asyncio.as_completed(tasks), 1):
+                index, result = await future
+                products = (result or {}).get("products") or []
+                logger.info(
+                    f"Chunk {index + 1} completed ({completed}/{len(chunks)} done): "
+                    f"{len(products)} products"
+                )
+                finished[index] = products
+
+                while next_index in finished:
+                    for product in finished.pop(next_index):
+                        yield product
+                    next_index += 1
+        finally:
+            # Cancel remaining chunks if the consumer stops early
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    @staticmethod
+    def _product_key(product: Dict[str, Any]) -> Optional[str]:
+        """
+        Build a deduplication key for an extracted product.
+
+        Uses the first available identifier (default_code, barcode, Code_EAN),
+        falling back to the normalized product name.
+
+        Returns:
+            Key string, or None if the product has no usable identifier
+        """
+        fields = product.get("fields") or {}
+
+        for field in ("default_code", "barcode", "Code_EAN"):
+            value = fields.get(field)
+            if isinstance(value, str) and value.strip() and value != "null":
+                return f"{field}:{value.strip()}"
+
+        name = fields.get("name")
+        if isinstance(name, str) and name.strip() and name != "null":
+            return f"name:{name.strip().lower()}"
+
+        return None
 
-                if result.get("products"):
-                    all_products.extend(result["products"])
-                    logger.info(f"Chunk {i+1} extracted {len(result['products'])} products")
+    def _merge_duplicate_products(
+        self,
+        products: List[Dict[str, Any]]
+    ) -> tuple[List[Dict[str, Any]], int]:
+        """
+        Merge products extracted more than once from overlapping chunks.
 
-                # Small delay to avoid rate limiting
-                if i < len(chunks) - 1:
-                    await asyncio.sleep(0.5)
+        For each field, the value with the highest confidence score is kept.
+
+        Args:
+            products: Products from all chunks
+
+        Returns:
+            Tuple of (deduplicated products, number of duplicates removed)
+        """
+        merged = []
+        by_key = {}
 
-            except Exception as e:
-                logger.error(f"Error processing chunk {i+1}: {e}")
+        for product in products:
+            key = self._product_key(product)
+            if key is None:
+                merged.append(product)
                 continue
 
-        # Merge results and deduplicate if needed
-        logger.info(f"Total products extracted from all chunks: {len(all_products)}")
+            kept = by_key.get(key)
+            if kept is None:
+                by_key[key] = product
+                merged.append(product)
+                continue
+
+            kept_fields = kept.setdefault("fields", {})
+            kept_scores = kept.setdefault("confidence_scores", {})
+            new_scores = product.get("confidence_scores") or {}
+
+            for field, new_value in (product.get("fields") or {}).items():
+                if new_value is None:
+                    continue
+                new_confidence = new_scores.get(field, 0)
+                if kept_fields.get(field) is None or new_confidence > kept_scores.get(field, 0):
+                    kept_fields[field] = new_value
+                    kept_scores[field] = new_confidence
+
+        return merged, len(products) - len(merged)
+
+    async def _extract_with_chunking(
+        self,
+        text: str,
+        model: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Extract product data from very long text by splitting into chunks.
+
+        Args:
+            text: Long text to process
+            model: OpenAI model to use
+
+        Returns:
+            Merged results from all chunks
+        """
+        chunks = self._split_into_chunks(text)
+        # In chunk order, so merged products keep a deterministic order
+        all_products = [p async for p in self._iter_chunk_products(chunks, model)]
+
+        # Overlapping chunks can extract the same product twice
+        all_products, dedup_removed = self._merge_duplicate_products(all_products)
+
+        logger.info(
+            f"Total products extracted from all chunks: {len(all_products)} "
+            f"(dedup_removed: {dedup_removed})"
+        )
 
         return {
             "products": all_products,
@@ -325,6 +535,48 @@ class OpenAIService:
 
         return "gpt-3.5-turbo"
 
+    async def batch_extract_stream(
+        self,
+        text_list: List[str],
+        max_concurrent: int = 3
+    ) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+        """
+        Extract product data from multiple texts concurrently, yielding results as they complete.
+
+        Args:
+            text_list: List of text extracts to process
+            max_concurrent: Maximum concurrent API calls
+
+        Yields:
+            Tuples of (index in text_list, extraction result), in completion order
+        """
+        semaphore = asyncio.Semaphore(max_concurrent)
+
+        async def extract_with_semaphore(index, text):
+            async with semaphore:
+                try:
+                    return index, await self.extract_product_data(text)
+                except Exception as e:
+                    logger.error(f"Batch extraction failed for item {index}: {e}")
+                    return index, {
+                        "products": [],
+                        "error": str(e)
+                    }
+
+        tasks = [
+            asyncio.create_task(extract_with_semaphore(i, text))
+            for i, text in enumerate(text_list)
+        ]
+
+        try:
+            for future in asyncio.as_completed(tasks):
+                yield await future
+        finally:
+            # Cancel remaining extractions if the consumer stops early
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
     async def batch_extract(
         self,
         text_list: List[str],
@@ -338,27 +590,25 @@ class OpenAIService:
             max_concurrent: Maximum concurrent API calls
 
         Returns:
-            List of extraction results
+            List of extraction results, in the same order as text_list
         """
-        semaphore = asyncio.Semaphore(max_concurrent)
-
-        async def extract_with_semaphore(text):
-            async with semaphore:
-                return await self.extract_product_data(text)
-
-        tasks = [extract_with_semaphore(text) for text in text_list]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-
-        # Handle exceptions
-        processed_results = []
-        for i, result in enumerate(results):
-            if isinstance(result, Exception):
-                logger.error(f"Batch extraction failed for item {i}: {result}")
-                processed_results.append({
-                    "products": [],
-                    "error": str(result)
-                })
-            else:
-                processed_results.append(result)
-
-        return processed_results
+        results = [None] * len(text_list)
+        async for index, result in self.batch_extract_stream(text_list, max_concurrent):
+            results[index] = result
+        return results
+
+
+# Singleton instance for reuse
+_openai_service = None
+_openai_service_lock = threading.Lock()
+
+
+def get_openai_service() -> OpenAIService:
+    """Get or create the OpenAI service singleton (reuses one HTTP client)."""
+    global _openai_service
+    if _openai_service is None:
+        # Double-checked locking: concurrent first calls create a single instance
+        with _openai_service_lock:
+            if _openai_service is None:
+                _openai_service = OpenAIService()
+    return _openai_service
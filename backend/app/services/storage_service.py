@@ -3,23 +3,161 @@ Storage service for MongoDB operations on products.
 Handles CRUD operations and bulk inserts.
 """
 
+import asyncio
 import logging
-from typing import List, Dict, Any, Optional
+import re
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
 from datetime import datetime
 from bson import ObjectId
-from pymongo.errors import BulkWriteError, DuplicateKeyError
-from app.api.schemas.product import Product, ProductCreate, ProductUpdate, ProductSource, ExtractionMetadata
+from pymongo import ReturnDocument, WriteConcern
+from pymongo.errors import BulkWriteError, DuplicateKeyError, PyMongoError
+from app.api.schemas.product import Product, ProductCreate, ProductUpdate, ExtractionMetadata
 from app.core.database import get_database
+from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Canonical ObjectId string; anything else cannot match a product, so skip the query
+OBJECT_ID_PATTERN = re.compile(r'[0-9a-fA-F]{24}')
+
+# String fields where OpenAI sometimes returns "null" as a string
+NULL_STRING_FIELDS = (
+    "length", "width", "height", "weight", "lst_price",
+    "default_code", "barcode", "Code_EAN", "name", "categ_id",
+    "country_of_origin", "constructeur", "refConstructeur",
+    "description_courte", "description_ecommerce", "features_description",
+    "hs_code", "fiche_constructeur_nom", "fiche_technique_nom"
+)
+
+# List fields and their defaults when missing or null
+LIST_FIELD_DEFAULTS = (
+    ("images", ()),
+    ("product_template_image_ids", ()),
+    ("sources", ()),
+    ("taxes_id", ("TVA 20%",)),
+    ("merged_from", ()),
+)
+
+# Boolean and string fields and their defaults when missing or null
+SCALAR_FIELD_DEFAULTS = (
+    ("active", True),
+    ("is_published", False),
+    ("contient_du_lithium", False),
+    ("is_master_record", False),
+    ("type", "product"),
+)
+
+# Identifiers used to find an existing product, most specific first
+IDENTIFIER_FIELDS = ("default_code", "barcode", "Code_EAN")
+
+# product_data keys that are never merged into an existing product
+ENRICH_SKIP_FIELDS = frozenset(("confidence_scores", "_id"))
+
+# Largest page fetched with a single $facet aggregation (the $facet result is
+# one document, capped at 16MB); bigger pages such as exports use count + find
+FACET_MAX_LIMIT = 200
+
+# Manual edit history kept per product (oldest entries are dropped)
+MANUAL_EDITS_LIMIT = 1000
+
+# Listing order; _id breaks created_at ties so keyset cursors are stable
+LIST_SORT = {"created_at": -1, "_id": -1}
+
+# Bumped when the stored defaults change; documents stamped with the current
+# version already carry every default and skip normalization on read
+SCHEMA_VERSION = 3
+
+# Update pipeline applying the same defaults as serialize_product server-side
+# ("null" strings are removed, so they read the same as missing values)
+SCHEMA_DEFAULTS_PIPELINE = [
+    {"$set": {
+        **{
+            field: {"$cond": [{"$eq": [f"${field}", "null"]}, "$$REMOVE", f"${field}"]}
+            for field in NULL_STRING_FIELDS
+        },
+        **{
+            field: {"$ifNull": [f"${field}", {"$literal": list(default_value)}]}
+            for field, default_value in LIST_FIELD_DEFAULTS
+        },
+        **{
+            field: {"$ifNull": [f"${field}", {"$literal": default_value}]}
+            for field, default_value in SCALAR_FIELD_DEFAULTS
+        },
+        "extraction_metadata": {"$ifNull": ["$extraction_metadata", {
+            "extraction_date": "$created_at",
+            "status": "raw",
+            "field_confidence_scores": {"$literal": {}},
+            "manual_edits": {"$literal": []},
+            "errors": {"$literal": []}
+        }]},
+    }},
+    # Field by field too: edit and merge stages can leave a partial extraction_metadata
+    {"$set": {
+        "extraction_metadata.extraction_date": {"$ifNull": ["$extraction_metadata.extraction_date", "$created_at"]},
+        "extraction_metadata.status": {"$ifNull": ["$extraction_metadata.status", "raw"]},
+        "extraction_metadata.field_confidence_scores": {
+            "$ifNull": ["$extraction_metadata.field_confidence_scores", {"$literal": {}}]
+        },
+        "extraction_metadata.manual_edits": {"$ifNull": ["$extraction_metadata.manual_edits", []]},
+        "extraction_metadata.errors": {"$ifNull": ["$extraction_metadata.errors", []]},
+        "_sv": SCHEMA_VERSION
+    }},
+]
+
 
 class StorageService:
     """Service for storing and retrieving products from MongoDB."""
 
+    # Lightweight projection for list views (only what the product list displays);
+    # keep in sync with the ProductListItem response model
+    LIST_PROJECTION = {
+        "name": 1,
+        "default_code": 1,
+        "constructeur": 1,
+        "lst_price": 1,
+        "description_courte": 1,
+        "images": {"$slice": ["$images", 1]},  # Truncated to the first image
+        "extraction_metadata.status": 1,
+        "extraction_metadata.field_confidence_scores": 1,
+        "created_at": 1,
+        "updated_at": 1,
+        "_sv": 1,
+    }
+
+    # Text search stops counting here; broad queries report "1000+" matches
+    SEARCH_COUNT_LIMIT = 1000
+
+    # Pool size is checked once per process, not on every request
+    _pool_checked = False
+
     def __init__(self, db):
+        """
+        Args:
+            db: Motor database. Its client pool (settings.mongodb_max_pool_size)
+                must hold at least settings.ingest_concurrency sockets so
+                concurrent bulk insert batches don't queue for a connection.
+        """
         self.db = db
         self.products_collection = db.products
+        # Bulk ingests are re-runnable: skip the journal ack. User edits wait for a majority.
+        self._bulk_collection = db.products.with_options(write_concern=WriteConcern(w=1, j=False))
+        self._edits_collection = db.products.with_options(write_concern=WriteConcern(w="majority"))
+
+        if not StorageService._pool_checked:
+            StorageService._pool_checked = True
+            self._check_pool_size()
+
+    def _check_pool_size(self):
+        """Warn when the connection pool is smaller than the bulk insert concurrency."""
+        client = getattr(self.db, "client", None)
+        if client is None:
+            return
+        max_pool_size = client.options.pool_options.max_pool_size
+        if max_pool_size < settings.ingest_concurrency:
+            logger.warning(
+                f"MongoDB maxPoolSize={max_pool_size} is below ingest_concurrency="
+                f"{settings.ingest_concurrency}; bulk insert batches will wait for sockets"
+            )
 
     @staticmethod
     def serialize_product(product: Dict[str, Any]) -> Dict[str, Any]:
@@ -31,67 +169,49 @@ class StorageService:
         if "_id" in product:
             product["_id"] = str(product["_id"])
 
-        # Clean string "null" values (OpenAI sometimes returns "null" as string)
-        null_string_fields = [
-            "length", "width", "height", "weight", "lst_price",
-            "default_code", "barcode", "Code_EAN", "name", "categ_id",
-            "country_of_origin", "constructeur", "refConstructeur",
-            "description_courte", "description_ecommerce", "features_description",
-            "hs_code", "fiche_constructeur_nom", "fiche_technique_nom"
-        ]
+        # Documents stored with the current schema already have every default
+        # (the _sv marker is internal and never returned to callers)
+        if product.pop("_sv", None) == SCHEMA_VERSION:
+            return product
 
-        for field in null_string_fields:
-            if field in product and product[field] == "null":
-                product[field] = None
+        return StorageService.apply_defaults(product)
 
-        # Ensure list fields have default values
-        list_fields_defaults = {
-            "images": [],
-            "product_template_image_ids": [],
-            "sources": [],
-            "taxes_id": ["TVA 20%"],
-            "merged_from": []
-        }
+    @staticmethod
+    def apply_defaults(product: Dict[str, Any]) -> Dict[str, Any]:
+        """Clean "null" strings and fill missing fields with their defaults (in place)."""
+        get = product.get
 
-        for field, default_value in list_fields_defaults.items():
-            if field not in product or product[field] is None:
-                product[field] = default_value
+        # Clean string "null" values (OpenAI sometimes returns "null" as string)
+        for field in NULL_STRING_FIELDS:
+            if get(field) == "null":
+                product[field] = None
+
+        # Ensure list fields have default values (copied so documents never share a list)
+        for field, default_value in LIST_FIELD_DEFAULTS:
+            if get(field) is None:
+                product[field] = list(default_value)
 
         # Ensure nested objects have defaults
-        if "extraction_metadata" not in product or product["extraction_metadata"] is None:
+        metadata = get("extraction_metadata")
+        if metadata is None:
             product["extraction_metadata"] = {
-                "extraction_date": product.get("created_at"),
+                "extraction_date": get("created_at"),
                 "status": "raw",
                 "field_confidence_scores": {},
                 "manual_edits": [],
                 "errors": []
             }
         else:
-            # Ensure nested lists exist
-            if "manual_edits" not in product["extraction_metadata"]:
-                product["extraction_metadata"]["manual_edits"] = []
-            if "errors" not in product["extraction_metadata"]:
-                product["extraction_metadata"]["errors"] = []
-
-        # Ensure boolean fields have defaults
-        boolean_defaults = {
-            "active": True,
-            "is_published": False,
-            "contient_du_lithium": False,
-            "is_master_record": False
-        }
-
-        for field, default_value in boolean_defaults.items():
-            if field not in product or product[field] is None:
-                product[field] = default_value
-
-        # Ensure string fields have defaults
-        string_defaults = {
-            "type": "product"
-        }
-
-        for field, default_value in string_defaults.items():
-            if field not in product or product[field] is None:
+            # Ensure nested fields exist
+            metadata.setdefault("extraction_date", get("created_at"))
+            metadata.setdefault("status", "raw")
+            metadata.setdefault("field_confidence_scores", {})
+            metadata.setdefault("manual_edits", [])
+            metadata.setdefault("errors", [])
+
+        # Ensure scalar fields (booleans, strings) have defaults
+        for field, default_value in SCALAR_FIELD_DEFAULTS:
+            if get(field) is None:
                 product[field] = default_value
 
         return product
@@ -99,56 +219,53 @@ class StorageService:
     async def create_product(
         self,
         product_data: Dict[str, Any],
-        sources: List[ProductSource] = None,
-        extraction_job_id: str = None
+        sources: List[Dict[str, Any]] = None,
+        extraction_job_id: str = None,
+        mutate: bool = False
     ) -> Dict[str, Any]:
         """
         Create a new product in the database.
 
+        Products with a default_code are upserted in a single round-trip:
+        inserted if the code is new, otherwise merged into the existing
+        product (see enrich_existing_product).
+
         Args:
             product_data: Product fields dict
-            sources: List of extraction sources
+            sources: Source dicts (convert ProductSource models with model_dump() first)
             extraction_job_id: ID of the extraction job that created this product
+            mutate: Build the stored document in product_data itself instead of a
+                copy (for callers that don't reuse the dict afterwards)
 
         Returns:
-            Created product dict with _id
+            Created (or enriched) product dict with _id as a string
         """
-        try:
-            # Prepare document
-            document = product_data.copy()
-            document["sources"] = [s.dict() if hasattr(s, 'dict') else s for s in (sources or [])]
-            document["extraction_metadata"] = {
-                "extraction_date": datetime.utcnow(),
-                "extraction_job_id": extraction_job_id,
-                "status": "raw",
-                "field_confidence_scores": product_data.get("confidence_scores", {}),
-                "manual_edits": [],
-                "errors": []
-            }
-            document["created_at"] = datetime.utcnow()
-            document["updated_at"] = datetime.utcnow()
-
-            # Remove confidence_scores from main document if present
-            document.pop("confidence_scores", None)
+        sources = sources or []
+        default_code = product_data.get("default_code")
 
-            # Remove null/empty unique fields to avoid duplicate key errors
-            # MongoDB unique sparse index doesn't allow multiple null values
-            if not document.get("default_code"):
-                document.pop("default_code", None)
-            if not document.get("barcode"):
-                document.pop("barcode", None)
-            if not document.get("Code_EAN"):
-                document.pop("Code_EAN", None)
-
-            # Insert into MongoDB
-            result = await self.products_collection.insert_one(document)
-            document["_id"] = result.inserted_id
+        try:
+            if _empty(default_code) or default_code == "null":
+                product = await self._insert_product(product_data, sources, extraction_job_id, mutate)
+                return self.serialize_product(product)
+
+            product = await self.products_collection.find_one_and_update(
+                {"default_code": default_code},
+                self._merge_pipeline(product_data, sources, extraction_job_id),
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
 
-            logger.info(f"Created product with ID: {result.inserted_id}")
-            return document
+            # Both timestamps come from the same $$NOW when the upsert inserted
+            # (.get: a matched legacy document may have no created_at)
+            created_at = product.get("created_at")
+            if created_at is not None and created_at == product.get("updated_at"):
+                logger.info(f"Created product with ID: {product['_id']}")
+            else:
+                logger.info(f"Enriched existing product {product['_id']} ({default_code})")
+            return self.serialize_product(product)
 
         except DuplicateKeyError as e:
-            # Product already exists - try to enrich it instead
+            # Lost an upsert race on the same default_code - merge into the winner
             logger.warning(f"Duplicate detected, attempting to enrich existing product")
             try:
                 return await self.enrich_existing_product(
@@ -163,10 +280,138 @@ class StorageService:
             logger.error(f"Error creating product: {e}")
             raise
 
+    async def _insert_product(
+        self,
+        product_data: Dict[str, Any],
+        sources: List[Dict[str, Any]],
+        extraction_job_id: str = None,
+        mutate: bool = False
+    ) -> Dict[str, Any]:
+        """Insert a product that has no default_code to match on."""
+        now = datetime.utcnow()
+
+        # Prepare document (confidence_scores moves into extraction_metadata)
+        document = product_data if mutate else product_data.copy()
+        confidence_scores = document.pop("confidence_scores", None)
+        document["sources"] = sources
+        document["extraction_metadata"] = {
+            "extraction_date": now,
+            "extraction_job_id": extraction_job_id,
+            "status": "raw",
+            "field_confidence_scores": confidence_scores if confidence_scores is not None else {},
+            "manual_edits": [],
+            "errors": []
+        }
+        document["created_at"] = now
+        document["updated_at"] = now
+
+        # Store with every default so reads can skip normalization
+        self.apply_defaults(document)
+        document["_sv"] = SCHEMA_VERSION
+
+        # Insert into MongoDB
+        result = await self.products_collection.insert_one(document)
+        document["_id"] = result.inserted_id
+
+        logger.info(f"Created product with ID: {result.inserted_id}")
+        return document
+
+    @staticmethod
+    def _merge_pipeline(
+        product_data: Dict[str, Any],
+        sources: List[Dict[str, Any]],
+        extraction_job_id: str = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Build the update pipeline that creates or enriches a product.
+
+        On a document being inserted by an upsert, timestamps and extraction
+        metadata are initialized and every non-empty field is set. On an
+        existing document, a field takes the new value when the stored one
+        is null/blank or the new confidence is higher.
+
+        Args:
+            product_data: Product fields dict (with optional confidence_scores)
+            sources: Source dicts to append
+            extraction_job_id: ID of the extraction job
+
+        Returns:
+            Aggregation pipeline for update_one/find_one_and_update
+        """
+        confidence_scores = product_data.get("confidence_scores") or {}
+
+        pipeline = [
+            # An upsert starts from the query fields only: no timestamps, no metadata
+            {"$set": {"_is_new": {"$and": [
+                {"$eq": [{"$type": "$created_at"}, "missing"]},
+                {"$eq": [{"$type": "$extraction_metadata"}, "missing"]}
+            ]}}},
+            {"$set": {
+                "created_at": {"$cond": ["$_is_new", "$$NOW", "$created_at"]},
+                "extraction_metadata": {"$cond": ["$_is_new", {
+                    "extraction_date": "$$NOW",
+                    "extraction_job_id": {"$literal": extraction_job_id},
+                    "status": "raw",
+                    "field_confidence_scores": {"$literal": confidence_scores},
+                    "manual_edits": {"$literal": []},
+                    "errors": {"$literal": []}
+                }, "$extraction_metadata"]}
+            }},
+        ]
+
+        # Merge fields server-side: keep non-null values with higher confidence
+        merge_stage = {}
+        get_confidence = confidence_scores.get
+        for field, new_value in product_data.items():
+            # Skip bookkeeping keys and None/empty new values
+            if field in ENRICH_SKIP_FIELDS or _empty(new_value):
+                continue
+
+            existing_value = f"${field}"
+            score_path = f"extraction_metadata.field_confidence_scores.{field}"
+            new_confidence = get_confidence(field, 0.5)
+
+            # Keep new value if:
+            # 1. Existing is null/empty, OR
+            # 2. New confidence is higher
+            should_update = {"$or": [
+                {"$eq": [{"$ifNull": [existing_value, None]}, None]},
+                {"$cond": [
+                    {"$eq": [{"$type": existing_value}, "string"]},
+                    {"$eq": [{"$trim": {"input": existing_value}}, ""]},
+                    False
+                ]},
+                {"$gt": [new_confidence, {"$ifNull": [f"${score_path}", 0.5]}]}
+            ]}
+
+            # Both expressions are evaluated against the document before update;
+            # new documents keep the scores exactly as extracted
+            merge_stage[field] = {"$cond": [should_update, {"$literal": new_value}, existing_value]}
+            merge_stage[score_path] = {"$cond": [
+                {"$cond": ["$_is_new", False, should_update]},
+                new_confidence,
+                f"${score_path}"
+            ]}
+
+        if merge_stage:
+            pipeline.append({"$set": merge_stage})
+
+        # Append new sources
+        pipeline.append({"$set": {
+            "sources": {"$concatArrays": [
+                {"$ifNull": ["$sources", []]},
+                {"$literal": sources}
+            ]},
+            "updated_at": "$$NOW"
+        }})
+        pipeline.extend(SCHEMA_DEFAULTS_PIPELINE)
+        pipeline.append({"$unset": "_is_new"})
+        return pipeline
+
     async def enrich_existing_product(
         self,
         product_data: Dict[str, Any],
-        sources: List[ProductSource] = None,
+        sources: List[Dict[str, Any]] = None,
         extraction_job_id: str = None
     ) -> Dict[str, Any]:
         """
@@ -174,132 +419,153 @@ class StorageService:
         Merges fields, keeping the most complete information.
         """
         try:
-            # Find existing product by unique identifiers
-            query = {}
-            if product_data.get("default_code"):
-                query = {"default_code": product_data["default_code"]}
-            elif product_data.get("barcode"):
-                query = {"barcode": product_data["barcode"]}
-            elif product_data.get("Code_EAN"):
-                query = {"Code_EAN": product_data["Code_EAN"]}
-            else:
+            # Find existing product by its most specific identifier (each is indexed)
+            get = product_data.get
+            field = next((f for f in IDENTIFIER_FIELDS if get(f)), None)
+            if field is None:
                 # No unique identifier - can't find existing product
                 raise ValueError("No unique identifier to find existing product")
+            query = {field: product_data[field]}
+
+            # Nothing to merge beyond the identifier and no new sources: skip the write
+            if not sources and not any(
+                key != field and key not in ENRICH_SKIP_FIELDS and not _empty(value)
+                for key, value in product_data.items()
+            ):
+                existing = await self.products_collection.find_one(query)
+                if not existing:
+                    raise ValueError("Existing product not found")
+                return self.serialize_product(existing)
+
+            # Single round-trip: merge and return the updated document atomically
+            updated_product = await self.products_collection.find_one_and_update(
+                query,
+                self._merge_pipeline(product_data, sources or [], extraction_job_id),
+                return_document=ReturnDocument.AFTER
+            )
 
-            existing = await self.products_collection.find_one(query)
-
-            if not existing:
+            if not updated_product:
                 raise ValueError("Existing product not found")
 
-            logger.info(f"Enriching existing product: {existing['_id']}")
+            logger.info(f"Enriched product {updated_product['_id']}")
+            return self.serialize_product(updated_product)
 
-            # Prepare enrichment data
-            confidence_scores = product_data.get("confidence_scores", {})
-            existing_scores = existing.get("extraction_metadata", {}).get("field_confidence_scores", {})
+        except Exception as e:
+            logger.error(f"Error enriching product: {e}")
+            raise
 
-            # Merge fields: keep non-null values with higher confidence
-            updates = {}
-            for field, new_value in product_data.items():
-                if field in ["confidence_scores", "_id"]:
-                    continue
+    async def backfill_schema_version(self) -> int:
+        """
+        Apply stored defaults to documents written before the current schema version.
 
-                # Skip if new value is None or empty
-                if new_value is None or (isinstance(new_value, str) and not new_value.strip()):
-                    continue
+        Idempotent: documents already at SCHEMA_VERSION are not touched.
 
-                existing_value = existing.get(field)
-                new_confidence = confidence_scores.get(field, 0.5)
-                existing_confidence = existing_scores.get(field, 0.5)
-
-                # Keep new value if:
-                # 1. Existing is null/empty, OR
-                # 2. New confidence is higher
-                should_update = (
-                    existing_value is None or
-                    (isinstance(existing_value, str) and not existing_value.strip()) or
-                    new_confidence > existing_confidence
-                )
+        Returns:
+            Number of documents migrated
+        """
+        result = await self.products_collection.update_many(
+            {"_sv": {"$ne": SCHEMA_VERSION}},
+            SCHEMA_DEFAULTS_PIPELINE
+        )
+        if result.modified_count:
+            logger.info(f"Migrated {result.modified_count} products to schema version {SCHEMA_VERSION}")
+        return result.modified_count
 
-                if should_update:
-                    updates[field] = new_value
-                    existing_scores[field] = new_confidence
-
-            # Add new sources
-            new_sources = [s.dict() if hasattr(s, 'dict') else s for s in (sources or [])]
-            existing_sources = existing.get("sources", [])
-            merged_sources = existing_sources + new_sources
-
-            # Update the product
-            update_doc = {
-                "$set": {
-                    **updates,
-                    "extraction_metadata.field_confidence_scores": existing_scores,
-                    "sources": merged_sources,
-                    "updated_at": datetime.utcnow()
-                }
-            }
+    async def _insert_batch(
+        self,
+        collection,
+        batch: Iterable[Dict[str, Any]]
+    ) -> tuple[int, List[Dict[str, Any]]]:
+        """
+        Insert one batch of documents (unordered).
 
-            result = await self.products_collection.update_one(
-                {"_id": existing["_id"]},
-                update_doc
+        Returns:
+            Tuple of (inserted count, write errors)
+        """
+        try:
+            result = await collection.insert_many(
+                batch,
+                ordered=False  # Continue on error
             )
+            return len(result.inserted_ids), []
 
-            logger.info(f"Enriched product {existing['_id']} with {len(updates)} fields")
-
-            # Return updated document
-            updated_product = await self.products_collection.find_one({"_id": existing["_id"]})
-            return updated_product
-
-        except Exception as e:
-            logger.error(f"Error enriching product: {e}")
-            raise
+        except BulkWriteError as bwe:
+            details = bwe.details
+            return details.get('nInserted', 0), details.get('writeErrors', [])
 
     async def bulk_insert_products(
         self,
         products: List[Dict[str, Any]],
-        batch_size: int = 100
+        batch_size: Optional[int] = None,
+        fast: bool = False,
+        sources: List[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """
-        Bulk insert products with batching.
+        Bulk insert products with concurrent batches.
+
+        Batches are inserted concurrently (at most settings.ingest_concurrency
+        in flight) so network round-trips overlap instead of running serially.
+        Product dicts are timestamped in place (not copied).
 
         Args:
             products: List of product dicts
-            batch_size: Number of products per batch
+            batch_size: Number of products per batch (default settings.ingest_batch_size).
+                The driver splits each batch into wire messages under the server's
+                size limits, so no byte-based cap is needed here.
+            fast: Use write concern w=1 without journal ack, for re-runnable
+                ingests where throughput matters more than durability
+            sources: Source dicts shared by every product without its own "sources"
 
         Returns:
             Dict with insert stats
         """
+        collection = self._bulk_collection if fast else self.products_collection
+
         total_inserted = 0
         total_errors = 0
         errors = []
 
         try:
-            # Process in batches
-            for i in range(0, len(products), batch_size):
-                batch = products[i:i+batch_size]
-
-                # Prepare documents
-                documents = []
-                for product in batch:
-                    doc = product.copy()
-                    doc["created_at"] = datetime.utcnow()
-                    doc["updated_at"] = datetime.utcnow()
-                    documents.append(doc)
-
-                try:
-                    result = await self.products_collection.insert_many(
-                        documents,
-                        ordered=False  # Continue on error
+            # One timestamp for the whole insert; documents are prepared lazily
+            # while each batch is encoded
+            now = datetime.utcnow()
+            shared_sources = sources or None
+
+            semaphore = asyncio.Semaphore(settings.ingest_concurrency)
+
+            async def insert_with_semaphore(batch):
+                async with semaphore:
+                    return await self._insert_batch(
+                        collection, _prepared(products, batch, now, shared_sources)
                     )
-                    total_inserted += len(result.inserted_ids)
-                    logger.info(f"Inserted batch of {len(result.inserted_ids)} products")
 
-                except BulkWriteError as bwe:
-                    inserted_count = bwe.details.get('nInserted', 0)
-                    total_inserted += inserted_count
-                    total_errors += len(bwe.details.get('writeErrors', []))
-                    errors.extend(bwe.details.get('writeErrors', []))
-                    logger.warning(f"Bulk write partial success: {inserted_count} inserted, {total_errors} errors")
+            # Batches are index ranges over products (no sliced copies)
+            batch_size = batch_size or settings.ingest_batch_size
+            batches = [
+                range(i, min(i + batch_size, len(products)))
+                for i in range(0, len(products), batch_size)
+            ]
+            results = await asyncio.gather(
+                *(insert_with_semaphore(batch) for batch in batches),
+                return_exceptions=True
+            )
+
+            for batch, result in zip(batches, results):
+                if isinstance(result, Exception):
+                    # Whole batch failed (e.g. network error)
+                    logger.error(f"Bulk insert batch of {len(batch)} products failed: {result}")
+                    total_errors += len(batch)
+                    errors.append({"errmsg": str(result), "count": len(batch)})
+                    continue
+                inserted_count, write_errors = result
+                total_inserted += inserted_count
+                total_errors += len(write_errors)
+                errors.extend(write_errors)
+
+            if total_errors:
+                logger.warning(f"Bulk write partial success: {total_inserted} inserted, {total_errors} errors")
+            else:
+                logger.info(f"Bulk inserted {total_inserted} products in {len(batches)} batches")
 
             return {
                 "total_inserted": total_inserted,
@@ -311,14 +577,31 @@ class StorageService:
             logger.error(f"Error in bulk insert: {e}")
             raise
 
-    async def get_product_by_id(self, product_id: str) -> Optional[Dict[str, Any]]:
-        """Get a product by its MongoDB _id."""
+    async def get_product_by_id(
+        self,
+        product_id: str,
+        projection: Optional[Dict[str, Any]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Get a product by its MongoDB _id.
+
+        Args:
+            product_id: Product MongoDB _id
+            projection: Fields to return, full document if None
+
+        Returns:
+            Product dict or None if not found
+        """
+        oid = _oid(product_id)
+        if oid is None:
+            return None
+
         try:
-            product = await self.products_collection.find_one({"_id": ObjectId(product_id)})
-            return self.serialize_product(product) if product else None
-        except Exception as e:
+            product = await self.products_collection.find_one({"_id": oid}, projection)
+        except PyMongoError as e:
             logger.error(f"Error getting product {product_id}: {e}")
             return None
+        return self.serialize_product(product) if product else None
 
     async def get_product_by_code(self, default_code: str) -> Optional[Dict[str, Any]]:
         """Get a product by its default_code."""
@@ -333,15 +616,19 @@ class StorageService:
         self,
         skip: int = 0,
         limit: int = 50,
-        filters: Dict[str, Any] = None
+        filters: Dict[str, Any] = None,
+        projection: Optional[Dict[str, Any]] = None,
+        cursor: Optional[Tuple[datetime, ObjectId]] = None
     ) -> tuple[List[Dict[str, Any]], int]:
         """
         Get paginated list of products with optional filters.
 
         Args:
-            skip: Number of products to skip
+            skip: Number of products to skip (ignored when cursor is given)
             limit: Maximum number of products to return
             filters: MongoDB query filters
+            projection: Fields to return (e.g. LIST_PROJECTION), full documents if None
+            cursor: (created_at, _id) of the last product already seen, see decode_cursor
 
         Returns:
             Tuple of (products list, total count)
@@ -349,15 +636,27 @@ class StorageService:
         try:
             query = filters or {}
 
-            # Get total count
-            total = await self.products_collection.count_documents(query)
-
-            # Get products
-            cursor = self.products_collection.find(query).sort("created_at", -1).skip(skip).limit(limit)
-            products = await cursor.to_list(length=limit)
+            if cursor is not None:
+                # Keyset pagination: seek past the last (created_at, _id) seen
+                # instead of walking and discarding `skip` documents
+                created_at, last_id = cursor
+                keyset = {"$or": [
+                    {"created_at": {"$lt": created_at}},
+                    {"created_at": created_at, "_id": {"$lt": last_id}}
+                ]}
+                page_query = {"$and": [query, keyset]} if query else keyset
+
+                total = await self._count(query)
+                products = await self.products_collection.find(
+                    page_query, projection, batch_size=limit
+                ).sort(list(LIST_SORT.items())).limit(limit).to_list(length=limit)
+            else:
+                products, total = await self._fetch_page(
+                    query, skip, limit, projection, sort=LIST_SORT
+                )
 
             # Serialize ObjectIds to strings
-            products = [self.serialize_product(p) for p in products]
+            products = _serialize_many(products)
 
             return products, total
 
@@ -365,6 +664,90 @@ class StorageService:
             logger.error(f"Error getting products: {e}")
             return [], 0
 
+    @staticmethod
+    def encode_cursor(product: Dict[str, Any]) -> Optional[str]:
+        """Build an opaque keyset cursor from the last product of a page."""
+        created_at = product.get("created_at")
+        if not isinstance(created_at, datetime) or not product.get("_id"):
+            return None
+        return f"{created_at.isoformat()}_{product['_id']}"
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+        """
+        Parse a cursor built by encode_cursor.
+
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        created_at, _, product_id = cursor.rpartition("_")
+        if not ObjectId.is_valid(product_id):
+            raise ValueError(f"Invalid cursor: {cursor}")
+        return datetime.fromisoformat(created_at), ObjectId(product_id)
+
+    async def _count(self, query: Dict[str, Any], limit: Optional[int] = None) -> int:
+        """Count matching products, up to `limit` (metadata count when unfiltered)."""
+        if not query:
+            return await self.products_collection.estimated_document_count()
+        if limit:
+            return await self.products_collection.count_documents(query, limit=limit)
+        return await self.products_collection.count_documents(query)
+
+    async def _fetch_page(
+        self,
+        query: Dict[str, Any],
+        skip: int,
+        limit: int,
+        projection: Optional[Dict[str, Any]] = None,
+        sort: Optional[Dict[str, Any]] = None,
+        count_limit: Optional[int] = None
+    ) -> tuple[List[Dict[str, Any]], int]:
+        """
+        Fetch one page of raw documents and the total match count.
+
+        Unfiltered listings use the collection metadata count. Filtered pages
+        up to FACET_MAX_LIMIT get page and count from one $facet aggregation.
+        Larger pages fall back to count_documents + find.
+
+        Args:
+            count_limit: Stop counting after this many matches (total is then capped)
+
+        Returns:
+            Tuple of (documents, total count)
+        """
+        if query and limit <= FACET_MAX_LIMIT:
+            data_stages = [{"$skip": skip}, {"$limit": limit}]
+            if projection:
+                data_stages.append({"$project": projection})
+
+            total_stages = [{"$count": "n"}]
+            if count_limit:
+                total_stages.insert(0, {"$limit": count_limit})
+
+            # Sort ahead of $facet: sub-pipelines never use indexes, so a
+            # $sort inside "data" would be a blocking in-memory sort
+            pipeline = [{"$match": query}]
+            if sort:
+                pipeline.append({"$sort": sort})
+            pipeline.append({"$facet": {"data": data_stages, "total": total_stages}})
+
+            result = await self.products_collection.aggregate(
+                pipeline, allowDiskUse=False
+            ).to_list(length=1)
+
+            facet = result[0] if result else {"data": [], "total": []}
+            total = facet["total"][0]["n"] if facet["total"] else 0
+            return facet["data"], total
+
+        total = await self._count(query, count_limit)
+
+        # One server batch for the whole page (no getMore round-trips)
+        cursor = self.products_collection.find(query, projection, batch_size=limit)
+        if sort:
+            cursor = cursor.sort(list(sort.items()))
+        documents = await cursor.skip(skip).limit(limit).to_list(length=limit)
+        return documents, total
+
     async def update_product(
         self,
         product_id: str,
@@ -382,40 +765,61 @@ class StorageService:
         Returns:
             Updated product dict
         """
+        oid = _oid(product_id)
+        if oid is None:
+            return None
+
         try:
-            # Get current product
-            current = await self.get_product_by_id(product_id)
-            if not current:
-                return None
+            # Diff and write in one atomic pipeline update: an edit entry is
+            # recorded for each field that exists and actually changes
+            edit_entries = [
+                {"$cond": [
+                    {"$and": [
+                        {"$ne": [{"$type": f"${field}"}, "missing"]},
+                        {"$ne": [f"${field}", {"$literal": new_value}]}
+                    ]},
+                    [{
+                        "field": field,
+                        "old_value": f"${field}",
+                        "new_value": {"$literal": new_value},
+                        "edited_date": "$$NOW",
+                        "edited_by": {"$literal": edited_by}
+                    }],
+                    []
+                ]}
+                for field, new_value in update_data.items()
+            ]
 
-            # Track manual edits
-            manual_edits = current.get("extraction_metadata", {}).get("manual_edits", [])
+            pipeline = [
+                {"$set": {
+                    # Append only the new edits, keeping the most recent MANUAL_EDITS_LIMIT
+                    "extraction_metadata.manual_edits": {"$slice": [
+                        {"$concatArrays": [
+                            {"$ifNull": ["$extraction_metadata.manual_edits", []]},
+                            *edit_entries
+                        ]},
+                        -MANUAL_EDITS_LIMIT
+                    ]}
+                }},
+                {"$set": {
+                    **{field: {"$literal": new_value} for field, new_value in update_data.items()},
+                    "updated_at": "$$NOW"
+                }},
+                # Legacy documents come out normalized and stamped
+                *SCHEMA_DEFAULTS_PIPELINE
+            ]
 
-            for field, new_value in update_data.items():
-                if field in current and current[field] != new_value:
-                    manual_edits.append({
-                        "field": field,
-                        "old_value": current[field],
-                        "new_value": new_value,
-                        "edited_date": datetime.utcnow(),
-                        "edited_by": edited_by
-                    })
-
-            # Update document
-            update_data["updated_at"] = datetime.utcnow()
-            update_data["extraction_metadata.manual_edits"] = manual_edits
-
-            result = await self.products_collection.update_one(
-                {"_id": ObjectId(product_id)},
-                {"$set": update_data}
+            updated = await self._edits_collection.find_one_and_update(
+                {"_id": oid},
+                pipeline,
+                return_document=ReturnDocument.AFTER
             )
 
-            if result.modified_count > 0:
-                logger.info(f"Updated product {product_id}")
-                return await self.get_product_by_id(product_id)
-            else:
-                logger.warning(f"No changes made to product {product_id}")
-                return current
+            if updated is None:
+                return None
+
+            logger.info(f"Updated product {product_id}")
+            return self.serialize_product(updated)
 
         except Exception as e:
             logger.error(f"Error updating product {product_id}: {e}")
@@ -423,56 +827,83 @@ class StorageService:
 
     async def delete_product(self, product_id: str) -> bool:
         """Delete a product by ID."""
+        oid = _oid(product_id)
+        if oid is None:
+            return False
+
         try:
-            result = await self.products_collection.delete_one({"_id": ObjectId(product_id)})
-            if result.deleted_count > 0:
-                logger.info(f"Deleted product {product_id}")
-                return True
-            else:
-                logger.warning(f"Product {product_id} not found")
-                return False
-        except Exception as e:
+            result = await self.products_collection.delete_one({"_id": oid})
+        except PyMongoError as e:
             logger.error(f"Error deleting product {product_id}: {e}")
             return False
 
+        if result.deleted_count > 0:
+            logger.info(f"Deleted product {product_id}")
+            return True
+        logger.warning(f"Product {product_id} not found")
+        return False
+
     async def search_products(
         self,
         search_text: str,
         skip: int = 0,
         limit: int = 50,
-        filters: Dict[str, Any] = None
+        filters: Dict[str, Any] = None,
+        projection: Optional[Dict[str, Any]] = None,
+        count_limit: Optional[int] = None
     ) -> tuple[List[Dict[str, Any]], int]:
         """
         Full-text search on products with optional additional filters.
 
+        Results are ranked by text score. Documents are projected before the
+        sort, and $sort + $skip + $limit run as one top-k sort, so only the
+        requested page is held in memory. The total comes from a separate
+        capped count.
+
         Args:
             search_text: Text to search for
             skip: Pagination skip
             limit: Max results
             filters: Additional filters (status, source_type)
+            projection: Fields to return (e.g. LIST_PROJECTION), full documents if None
+            count_limit: Stop counting matches after this many (e.g. SEARCH_COUNT_LIMIT)
 
         Returns:
-            Tuple of (products, total count)
-        """
-        try:
-            query = {"$text": {"$search": search_text}}
-
-            # Add additional filters
-            if filters:
-                additional_query = self._build_filter_query(filters)
-                query = {"$and": [query, additional_query]}
+            Tuple of (products, total count capped at count_limit)
 
-            total = await self.products_collection.count_documents(query)
-            cursor = self.products_collection.find(query).skip(skip).limit(limit)
-            products = await cursor.to_list(length=limit)
-
-            # Serialize ObjectIds to strings
-            products = [self.serialize_product(p) for p in products]
+        Raises:
+            PyMongoError: If the search fails (not reported as "no results")
+        """
+        query = {"$text": {"$search": search_text}}
+
+        # Add additional filters
+        if filters:
+            additional_query = self._build_filter_query(filters)
+            query = {"$and": [query, additional_query]}
+
+        score = {"$meta": "textScore"}
+        pipeline = [
+            {"$match": query},
+            {"$project": {**projection, "score": score}} if projection else {"$set": {"score": score}},
+            {"$sort": {"score": -1, "_id": -1}},
+            {"$skip": skip},
+            {"$limit": limit},
+            {"$unset": "score"},
+        ]
 
-            return products, total
-        except Exception as e:
+        try:
+            products, total = await asyncio.gather(
+                self.products_collection.aggregate(
+                    pipeline, allowDiskUse=True, batchSize=limit
+                ).to_list(length=limit),
+                self._count(query, count_limit)
+            )
+        except PyMongoError as e:
             logger.error(f"Error searching products: {e}")
-            return [], 0
+            raise
+
+        # Serialize ObjectIds to strings
+        return _serialize_many(products), total
 
     def _build_filter_query(self, filters: Dict[str, Any]) -> Dict[str, Any]:
         """Build MongoDB query from filter dict."""
@@ -490,7 +921,9 @@ class StorageService:
         self,
         filters: Dict[str, Any],
         skip: int = 0,
-        limit: int = 50
+        limit: int = 50,
+        projection: Optional[Dict[str, Any]] = None,
+        cursor: Optional[Tuple[datetime, ObjectId]] = None
     ) -> tuple[List[Dict[str, Any]], int]:
         """
         Get products with multiple filters.
@@ -499,13 +932,15 @@ class StorageService:
             filters: Dict with filter keys (status, source_type)
             skip: Pagination skip
             limit: Max results
+            projection: Fields to return, full documents if None
+            cursor: Keyset cursor, see get_products
 
         Returns:
             Tuple of (products, total count)
         """
         try:
             query = self._build_filter_query(filters)
-            return await self.get_products(skip, limit, query)
+            return await self.get_products(skip, limit, query, projection, cursor)
         except Exception as e:
             logger.error(f"Error getting products with filters: {e}")
             return [], 0
@@ -526,21 +961,31 @@ class StorageService:
         validated_by: str = None
     ) -> Optional[Dict[str, Any]]:
         """Mark a product as validated."""
+        oid = _oid(product_id)
+        if oid is None:
+            return None
+
         update_data = {
             "extraction_metadata.status": "validated",
-            "extraction_metadata.validation_date": datetime.utcnow(),
-            "extraction_metadata.validated_by": validated_by,
-            "updated_at": datetime.utcnow()
+            "extraction_metadata.validated_by": validated_by
         }
 
-        result = await self.products_collection.update_one(
-            {"_id": ObjectId(product_id)},
-            {"$set": update_data}
+        # Timestamps come from the server clock
+        updated = await self._edits_collection.find_one_and_update(
+            {"_id": oid},
+            {
+                "$set": update_data,
+                "$currentDate": {
+                    "extraction_metadata.validation_date": True,
+                    "updated_at": True
+                }
+            },
+            return_document=ReturnDocument.AFTER
         )
 
-        if result.modified_count > 0:
+        if updated is not None:
             logger.info(f"Validated product {product_id}")
-            return await self.get_product_by_id(product_id)
+            return self.serialize_product(updated)
         return None
 
     async def get_duplicates_by_code(
@@ -597,24 +1042,24 @@ class StorageService:
                         "count": {"$gte": min_count}
                     }
                 },
-                # Sort by count descending (most duplicates first)
+                # Group once, then take the page and the total from the same result
                 {
-                    "$sort": {"count": -1}
+                    "$facet": {
+                        # Sort by count descending (most duplicates first)
+                        "groups": [
+                            {"$sort": {"count": -1}},
+                            {"$skip": skip},
+                            {"$limit": limit}
+                        ],
+                        "total": [{"$count": "n"}]
+                    }
                 }
             ]
 
-            # Get total count first
-            count_pipeline = pipeline + [{"$count": "total"}]
-            count_result = await self.products_collection.aggregate(count_pipeline).to_list(1)
-            total = count_result[0]["total"] if count_result else 0
-
-            # Get paginated results
-            paginated_pipeline = pipeline + [
-                {"$skip": skip},
-                {"$limit": limit}
-            ]
-
-            groups = await self.products_collection.aggregate(paginated_pipeline).to_list(limit)
+            result = await self.products_collection.aggregate(pipeline).to_list(length=1)
+            facet = result[0] if result else {"groups": [], "total": []}
+            groups = facet["groups"]
+            total = facet["total"][0]["n"] if facet["total"] else 0
 
             # Format response
             formatted_groups = [
@@ -635,26 +1080,30 @@ class StorageService:
 
     async def get_products_by_default_code(
         self,
-        default_code: str
+        default_code: str,
+        projection: Optional[Dict[str, Any]] = None
     ) -> List[Dict[str, Any]]:
         """
         Get all products with a specific default_code.
 
         Args:
             default_code: The default_code to search for
+            projection: Fields to return, full documents if None
 
         Returns:
             List of products with that default_code
         """
         try:
             cursor = self.products_collection.find(
-                {"default_code": default_code}
-            ).sort("created_at", -1)
+                {"default_code": default_code},
+                projection,
+                batch_size=100
+            ).sort("created_at", -1).limit(100)
 
             products = await cursor.to_list(length=100)
 
             # Serialize all products
-            products = [self.serialize_product(p) for p in products]
+            products = _serialize_many(products)
 
             logger.info(f"Found {len(products)} products with code {default_code}")
             return products
@@ -662,3 +1111,54 @@ class StorageService:
         except Exception as e:
             logger.error(f"Error getting products by code {default_code}: {e}")
             return []
+
+
+def _empty(value: Any) -> bool:
+    """True for None and blank strings (exact str type check, no MRO walk)."""
+    return value is None or (type(value) is str and not value.strip())
+
+
+def _oid(value: Any) -> Optional[ObjectId]:
+    """ObjectId for an id string (or ObjectId), None if it can't be one - no exception path."""
+    if type(value) is ObjectId:
+        return value
+    if type(value) is str and OBJECT_ID_PATTERN.fullmatch(value):
+        return ObjectId(value)
+    return None
+
+
+def _prepared(
+    products: List[Dict[str, Any]],
+    indexes: range,
+    now: datetime,
+    shared_sources: Optional[List[Dict[str, Any]]]
+) -> Iterator[Dict[str, Any]]:
+    """Yield products of one batch, timestamped in place, for insert_many."""
+    for i in indexes:
+        product = products[i]
+        product["created_at"] = now
+        product["updated_at"] = now
+        if shared_sources is not None:
+            product.setdefault("sources", shared_sources)
+        yield product
+
+
+def _serialize_many(docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Serialize a page of documents in one pass.
+
+    Same result as calling StorageService.serialize_product on each document,
+    with the per-document lookups hoisted into locals.
+    """
+    version = SCHEMA_VERSION
+    apply_defaults = StorageService.apply_defaults
+    out = []
+    append = out.append
+    for doc in docs:
+        if doc:
+            if "_id" in doc:
+                doc["_id"] = str(doc["_id"])
+            if doc.pop("_sv", None) != version:
+                apply_defaults(doc)
+        append(doc)
+    return out
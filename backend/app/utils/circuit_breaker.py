@@ -0,0 +1,131 @@
+"""
+Minimal circuit breaker for calls to external services (Odoo, OpenAI).
+Fails fast while an upstream is down instead of hammering it with retries.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Tuple, Type
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreakerError(Exception):
+    """Raised when a call is rejected because the circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker with closed / open / half_open states.
+
+    After `fail_max` consecutive failures the circuit opens and calls are
+    rejected for `reset_timeout` seconds. A single trial call is then let
+    through (half_open) while concurrent calls are still rejected: success
+    closes the circuit, failure opens it again.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fail_max: int = 10,
+        reset_timeout: float = 30.0,
+        failure_exceptions: Tuple[Type[BaseException], ...] = (Exception,)
+    ):
+        """
+        Args:
+            name: Name used in logs and errors
+            fail_max: Consecutive failures before opening the circuit
+            reset_timeout: Seconds to wait before letting a trial call through
+            failure_exceptions: Exception types counted as failures
+        """
+        self.name = name
+        self.fail_max = fail_max
+        self.reset_timeout = reset_timeout
+        self.failure_exceptions = failure_exceptions
+        self._fail_count = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """Current state: "closed", "open" or "half_open"."""
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return "half_open"
+            return "open"
+
+    def before_call(self):
+        """
+        Raise CircuitBreakerError if the circuit is open.
+
+        In half_open, only the first caller is let through as the trial call;
+        it must end with record_success, record_failure or release_trial.
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if (
+                time.monotonic() - self._opened_at >= self.reset_timeout
+                and not self._trial_in_flight
+            ):
+                self._trial_in_flight = True
+                return
+        raise CircuitBreakerError(f"Circuit '{self.name}' is open - upstream unavailable")
+
+    def release_trial(self):
+        """End a trial call without counting it as a success or a failure."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self):
+        """Reset the failure count and close the circuit."""
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info(f"Circuit '{self.name}' closed")
+            self._fail_count = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        """Count a failure and open the circuit once fail_max is reached."""
+        with self._lock:
+            self._fail_count += 1
+            self._trial_in_flight = False
+            if self._fail_count >= self.fail_max:
+                if self._opened_at is None:
+                    logger.warning(
+                        f"Circuit '{self.name}' opened after {self._fail_count} failures"
+                    )
+                self._opened_at = time.monotonic()
+
+    def call(self, func: Callable, *args, **kwargs) -> Any:
+        """Call a sync function through the breaker."""
+        self.before_call()
+        try:
+            result = func(*args, **kwargs)
+        except self.failure_exceptions:
+            self.record_failure()
+            raise
+        except BaseException:
+            self.release_trial()
+            raise
+        self.record_success()
+        return result
+
+    async def call_async(self, func: Callable, *args, **kwargs) -> Any:
+        """Call a coroutine function through the breaker."""
+        self.before_call()
+        try:
+            result = await func(*args, **kwargs)
+        except self.failure_exceptions:
+            self.record_failure()
+            raise
+        except BaseException:
+            self.release_trial()
+            raise
+        self.record_success()
+        return result
@@ -0,0 +1,31 @@
+"""
+One-shot migration: stamp products written before the current schema version.
+
+Applies the stored defaults (SCHEMA_DEFAULTS_PIPELINE) to every product whose
+_sv is not SCHEMA_VERSION, so reads can skip normalization. Idempotent; run it
+once after deploying a new SCHEMA_VERSION, from the backend directory:
+
+    python -m scripts.backfill_schema_version
+"""
+
+import asyncio
+import logging
+
+from app.core.database import database
+from app.services.storage_service import StorageService, SCHEMA_VERSION
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+async def main():
+    await database.connect()
+    try:
+        migrated = await StorageService(database.db).backfill_schema_version()
+        logger.info(f"Schema backfill done: {migrated} products stamped with version {SCHEMA_VERSION}")
+    finally:
+        await database.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
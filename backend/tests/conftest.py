@@ -0,0 +1,11 @@
+"""
+Shared test setup.
+
+app.config.Settings requires these variables; unit tests never connect to
+MongoDB or OpenAI, so placeholders are enough.
+"""
+
+import os
+
+os.environ.setdefault("MONGODB_URL", "mongodb://localhost:27017")
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
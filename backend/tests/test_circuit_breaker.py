@@ -0,0 +1,141 @@
+"""
+Tests for the circuit breaker state machine.
+"""
+
+import asyncio
+
+import pytest
+
+from app.utils import circuit_breaker as cb
+from app.utils.circuit_breaker import CircuitBreaker, CircuitBreakerError
+
+
+class FakeClock:
+    """Stand-in for time.monotonic that only moves when told to."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(cb.time, "monotonic", fake)
+    return fake
+
+
+def make_breaker():
+    return CircuitBreaker("test", fail_max=3, reset_timeout=30, failure_exceptions=(OSError,))
+
+
+def fail():
+    raise OSError("upstream down")
+
+
+def trip(breaker):
+    for _ in range(breaker.fail_max):
+        with pytest.raises(OSError):
+            breaker.call(fail)
+
+
+def test_opens_after_fail_max_consecutive_failures(clock):
+    breaker = make_breaker()
+
+    for _ in range(breaker.fail_max - 1):
+        with pytest.raises(OSError):
+            breaker.call(fail)
+        assert breaker.state == "closed"
+
+    with pytest.raises(OSError):
+        breaker.call(fail)
+    assert breaker.state == "open"
+
+
+def test_success_resets_failure_count(clock):
+    breaker = make_breaker()
+
+    for _ in range(breaker.fail_max - 1):
+        with pytest.raises(OSError):
+            breaker.call(fail)
+    assert breaker.call(lambda: "ok") == "ok"
+
+    with pytest.raises(OSError):
+        breaker.call(fail)
+    assert breaker.state == "closed"
+
+
+def test_rejects_calls_while_open(clock):
+    breaker = make_breaker()
+    trip(breaker)
+    called = []
+
+    with pytest.raises(CircuitBreakerError):
+        breaker.call(lambda: called.append(True))
+    assert called == []
+
+
+def test_half_open_lets_exactly_one_trial_through(clock):
+    breaker = make_breaker()
+    trip(breaker)
+    clock.now += breaker.reset_timeout
+    assert breaker.state == "half_open"
+
+    breaker.before_call()  # the trial
+    with pytest.raises(CircuitBreakerError):
+        breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+    breaker.before_call()
+
+
+def test_failed_trial_reopens_the_circuit(clock):
+    breaker = make_breaker()
+    trip(breaker)
+    clock.now += breaker.reset_timeout
+
+    with pytest.raises(OSError):
+        breaker.call(fail)
+    assert breaker.state == "open"
+    with pytest.raises(CircuitBreakerError):
+        breaker.before_call()
+
+
+def test_trial_released_on_non_failure_exception(clock):
+    breaker = make_breaker()
+    trip(breaker)
+    clock.now += breaker.reset_timeout
+
+    def fault():
+        raise ValueError("not a transport error")
+
+    with pytest.raises(ValueError):
+        breaker.call(fault)
+
+    # Not counted either way: still half_open, and the next trial is allowed
+    assert breaker.state == "half_open"
+    assert breaker.call(lambda: "ok") == "ok"
+    assert breaker.state == "closed"
+
+
+def test_trial_released_when_async_call_is_cancelled(clock):
+    breaker = make_breaker()
+    trip(breaker)
+    clock.now += breaker.reset_timeout
+
+    async def hang():
+        await asyncio.sleep(3600)
+
+    async def run():
+        task = asyncio.create_task(breaker.call_async(hang))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+
+    breaker.before_call()  # a new trial is allowed
@@ -0,0 +1,72 @@
+"""
+Tests for merging products extracted from overlapping chunks.
+"""
+
+import pytest
+
+from app.services.openai_service import OpenAIService
+
+
+@pytest.fixture
+def service():
+    return OpenAIService()
+
+
+def product(fields, scores=None):
+    return {"fields": fields, "confidence_scores": scores or {}}
+
+
+def test_keeps_highest_confidence_value_per_field(service):
+    products = [
+        product({"default_code": "A1", "name": "Drill", "weight": 1.0}, {"name": 0.9, "weight": 0.4}),
+        product({"default_code": "A1", "name": "drill", "weight": 1.2}, {"name": 0.5, "weight": 0.8}),
+    ]
+
+    merged, removed = service._merge_duplicate_products(products)
+
+    assert removed == 1
+    assert len(merged) == 1
+    assert merged[0]["fields"] == {"default_code": "A1", "name": "Drill", "weight": 1.2}
+    assert merged[0]["confidence_scores"] == {"name": 0.9, "weight": 0.8}
+
+
+def test_fills_missing_fields_from_duplicates(service):
+    products = [
+        product({"default_code": "A1", "barcode": None}),
+        product({"default_code": "A1", "barcode": "123", "lst_price": 9.5}, {"barcode": 0.7}),
+    ]
+
+    merged, _ = service._merge_duplicate_products(products)
+
+    assert merged[0]["fields"]["barcode"] == "123"
+    assert merged[0]["fields"]["lst_price"] == 9.5
+
+
+def test_matches_on_first_identifier_then_name(service):
+    products = [
+        product({"barcode": "123", "name": "Saw"}),
+        product({"barcode": "123", "name": "Other"}),
+        product({"name": "  Hammer "}),
+        product({"name": "hammer"}),
+        product({"default_code": "null", "name": "Hammer"}),
+    ]
+
+    merged, removed = service._merge_duplicate_products(products)
+
+    assert removed == 3
+    assert [p["fields"]["name"] for p in merged] == ["Saw", "  Hammer "]
+
+
+def test_products_without_key_are_kept_in_order(service):
+    products = [
+        product({"default_code": "B"}),
+        product({}),
+        product({"default_code": "A"}),
+        product({"description_courte": "no identifier"}),
+        product({"default_code": "B"}),
+    ]
+
+    merged, removed = service._merge_duplicate_products(products)
+
+    assert removed == 1
+    assert merged == [products[0], products[1], products[2], products[3]]
@@ -0,0 +1,49 @@
+"""
+Tests for the keyset pagination cursor helpers.
+"""
+
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from app.services.storage_service import StorageService
+
+
+def test_cursor_round_trip():
+    oid = ObjectId()
+    created_at = datetime(2024, 3, 1, 12, 30, 15, 123456)
+
+    cursor = StorageService.encode_cursor({"_id": oid, "created_at": created_at})
+
+    assert StorageService.decode_cursor(cursor) == (created_at, oid)
+
+
+def test_cursor_round_trip_with_string_id():
+    oid = ObjectId()
+    created_at = datetime(2024, 3, 1)
+
+    cursor = StorageService.encode_cursor({"_id": str(oid), "created_at": created_at})
+
+    assert StorageService.decode_cursor(cursor) == (created_at, oid)
+
+
+@pytest.mark.parametrize("product", [
+    {"_id": ObjectId()},
+    {"_id": ObjectId(), "created_at": "2024-03-01T00:00:00"},
+    {"created_at": datetime(2024, 3, 1)},
+])
+def test_encode_cursor_without_keys_returns_none(product):
+    assert StorageService.encode_cursor(product) is None
+
+
+@pytest.mark.parametrize("cursor", [
+    "",
+    "garbage",
+    f"2024-03-01T00:00:00_{'z' * 24}",
+    f"not-a-date_{ObjectId()}",
+    str(ObjectId()),
+])
+def test_decode_cursor_rejects_malformed_input(cursor):
+    with pytest.raises(ValueError):
+        StorageService.decode_cursor(cursor)
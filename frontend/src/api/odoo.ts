@@ -44,7 +44,8 @@ export interface OdooProductDetail extends OdooProduct {
   // Tax
   taxes_id: number[] | null;
 
-  // Images (Base64 encoded)
+  // Images (Base64 encoded, only the requested image_size is populated)
+  image_size: number;
   image_1920: string | null;
   image_1024: string | null;
   image_512: string | null;
@@ -64,10 +65,11 @@ export interface OdooProductDetail extends OdooProduct {
 
 export interface OdooProductListResponse {
   products: OdooProduct[];
-  total: number;
+  total: number | null; // null when requested with exact_count=false
   page: number;
   limit: number;
-  pages: number;
+  pages: number | null; // null when requested with exact_count=false
+  has_more: boolean;
 }
 
 export interface OdooConnectionStatus {
@@ -96,6 +98,8 @@ export const odooApi = {
     limit?: number;
     search?: string;
     active_only?: boolean;
+    exact_count?: boolean;
+    view?: 'card' | 'table';
   }): Promise<OdooProductListResponse> => {
     const { data } = await apiClient.get<OdooProductListResponse>('/odoo/products', {
       params,
@@ -106,13 +110,20 @@ export const odooApi = {
   /**
    * Get a single product from Odoo by ID.
    */
-  getProduct: async (productId: number): Promise<OdooProductDetail> => {
+  getProduct: async (productId: number, imageSize?: number): Promise<OdooProductDetail> => {
     const { data } = await apiClient.get<{ product: OdooProductDetail }>(
-      `/odoo/products/${productId}`
+      `/odoo/products/${productId}`,
+      { params: imageSize ? { image_size: imageSize } : undefined }
     );
     return data.product;
   },
 
+  /**
+   * URL of the full resolution (1920px) image of an Odoo product, fetched on demand.
+   */
+  getRawImageUrl: (productId: number): string =>
+    `${apiClient.defaults.baseURL}/odoo/products/${productId}/raw_image`,
+
   /**
    * Find matching products in our catalog for an Odoo product.
    */
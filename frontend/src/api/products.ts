@@ -20,6 +20,7 @@ export const productApi = {
     limit?: number;
     status?: string;
     search?: string;
+    cursor?: string;
   }): Promise<ProductListResponse> => {
     const { data } = await apiClient.get<ProductListResponse>('/products', {
       params,
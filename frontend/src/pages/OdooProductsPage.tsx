@@ -47,6 +47,7 @@ export default function OdooProductsPage() {
     refetch: refetchProducts,
   } = useQuery({
     queryKey: ['odoo-products', page, limit, search],
+    // No exact_count: paging relies on has_more, total is only known on the last page
     queryFn: () => odooApi.getProducts({ page, limit, search: search || undefined }),
     enabled: connectionStatus?.status === 'connected',
   });
@@ -176,8 +177,11 @@ export default function OdooProductsPage() {
               {/* Stats */}
               <div className="mb-4 flex items-center justify-between">
                 <p className="text-sm text-gray-600">
-                  Showing {((page - 1) * limit) + 1} - {Math.min(page * limit, productsData.total)} of{' '}
-                  <strong>{productsData.total}</strong> products
+                  Showing {((page - 1) * limit) + 1} - {((page - 1) * limit) + productsData.products.length}
+                  {productsData.total !== null && (
+                    <> of <strong>{productsData.total}</strong></>
+                  )}{' '}
+                  products
                   {search && <span> matching "{search}"</span>}
                 </p>
               </div>
@@ -224,10 +228,11 @@ export default function OdooProductsPage() {
               </div>
 
               {/* Pagination */}
-              {productsData.pages > 1 && (
+              {(page > 1 || productsData.has_more) && (
                 <div className="mt-6 flex items-center justify-between">
                   <p className="text-sm text-gray-600">
-                    Page {productsData.page} of {productsData.pages}
+                    Page {productsData.page}
+                    {productsData.pages !== null && <> of {productsData.pages}</>}
                   </p>
 
                   <div className="flex gap-2">
@@ -240,8 +245,8 @@ export default function OdooProductsPage() {
                       Previous
                     </button>
                     <button
-                      onClick={() => setPage((p) => Math.min(productsData.pages, p + 1))}
-                      disabled={page === productsData.pages}
+                      onClick={() => setPage((p) => p + 1)}
+                      disabled={!productsData.has_more}
                       className="flex items-center gap-1 px-4 py-2 bg-white border rounded-md hover:bg-gray-50 disabled:opacity-50 disabled:cursor-not-allowed"
                     >
                       Next
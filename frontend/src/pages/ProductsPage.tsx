@@ -6,7 +6,7 @@ import { useState } from 'react';
 import { useQuery } from '@tanstack/react-query';
 import { useNavigate } from 'react-router-dom';
 import { productApi } from '../api/products';
-import { Product } from '../types/product';
+import { ProductListItem } from '../types/product';
 import { Search, Package, CheckCircle, Clock, AlertCircle, Download } from 'lucide-react';
 
 export default function ProductsPage() {
@@ -54,7 +54,7 @@ export default function ProductsPage() {
     }
   };
 
-  const getStatusBadge = (status: string) => {
+  const getStatusBadge = (status?: string | null) => {
     const statusConfig = {
       raw: {
         color: 'bg-yellow-100 text-yellow-800',
@@ -97,7 +97,7 @@ export default function ProductsPage() {
     return 'text-red-600';
   };
 
-  const getAverageConfidence = (product: Product) => {
+  const getAverageConfidence = (product: ProductListItem) => {
     const scores = Object.values(
       product.extraction_metadata?.field_confidence_scores || {}
     );
@@ -171,7 +171,7 @@ export default function ProductsPage() {
           <div className="flex items-center justify-end text-sm text-gray-600">
             {data && (
               <span>
-                {data.total} products ({data.pages} pages)
+                {data.total}{data.total_capped ? '+' : ''} products ({data.pages} pages)
               </span>
             )}
           </div>
@@ -247,7 +247,7 @@ export default function ProductsPage() {
                     )}
                   </div>
 
-                  {product.images.length > 0 && (
+                  {(product.images?.length ?? 0) > 0 && (
                     <div className="ml-4">
                       <div className="w-16 h-16 bg-gray-100 rounded-md flex items-center justify-center">
                         <Package className="h-8 w-8 text-gray-400" />
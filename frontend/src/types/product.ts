@@ -138,12 +138,32 @@ export interface Product {
   write_date?: string;
 }
 
+// Row of the product list: only the projected fields, none defaulted.
+// images holds at most the first image.
+export interface ProductListItem {
+  _id: string;
+  name?: string | null;
+  default_code?: string | null;
+  constructeur?: string | null;
+  lst_price?: number | null;
+  description_courte?: string | null;
+  images?: ProductImage[] | null;
+  extraction_metadata?: {
+    status?: ExtractionMetadata['status'] | null;
+    field_confidence_scores?: Record<string, number> | null;
+  } | null;
+  created_at?: string | null;
+  updated_at?: string | null;
+}
+
 export interface ProductListResponse {
-  products: Product[];
+  products: ProductListItem[];
   total: number;
   page: number;
   limit: number;
   pages: number;
+  next_cursor?: string | null;
+  total_capped?: boolean;
 }
 
 export interface ProductResponse {